@@ -0,0 +1,36 @@
+"""add_typed_value_indexes_to_record_values
+
+Revision ID: 4b1e7d2c9a30
+Revises: 0ca53a81e0e8
+Create Date: 2025-06-02 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e7d2c9a30'
+down_revision: Union[str, None] = '0ca53a81e0e8' # Previous migration for creating table_permissions
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ### commands manually created ###
+    # One index per typed column so that sorting/filtering records by a field is an index range scan
+    op.create_index('ix_record_values_field_value_number', 'record_values', ['field_id', 'value_number', 'record_id'], unique=False)
+    op.create_index('ix_record_values_field_value_text', 'record_values', ['field_id', 'value_text', 'record_id'], unique=False)
+    op.create_index('ix_record_values_field_value_datetime', 'record_values', ['field_id', 'value_datetime', 'record_id'], unique=False)
+    op.create_index('ix_record_values_field_value_boolean', 'record_values', ['field_id', 'value_boolean', 'record_id'], unique=False)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands manually created ###
+    op.drop_index('ix_record_values_field_value_boolean', table_name='record_values')
+    op.drop_index('ix_record_values_field_value_datetime', table_name='record_values')
+    op.drop_index('ix_record_values_field_value_text', table_name='record_values')
+    op.drop_index('ix_record_values_field_value_number', table_name='record_values')
+    # ### end Alembic commands ###
@@ -0,0 +1,42 @@
+"""queue_formula_backfill_jobs
+
+Revision ID: 5e2a8c7d1f03
+Revises: 9d3f6a1b2c47
+Create Date: 2025-06-12 10:04:51.220731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a8c7d1f03'
+down_revision: Union[str, None] = '9d3f6a1b2c47' # Previous migration for the jobs table
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Data migration: records are read with their stored formula values, and formula fields created before values
+# were stored have none. Queue one formula_backfill job per table with formula fields; the app runs queued jobs
+# on startup (jobs.resume_jobs), so the values are filled in chunks after the deploy.
+fields = sa.table('fields', sa.column('id', sa.Integer), sa.column('table_id', sa.Integer), sa.column('type', sa.String))
+tables = sa.table('tables', sa.column('id', sa.Integer), sa.column('owner_id', sa.Integer))
+jobs = sa.table('jobs', sa.column('type', sa.String), sa.column('status', sa.String), sa.column('owner_id', sa.Integer), sa.column('table_id', sa.Integer),
+                sa.column('params', sa.JSON), sa.column('state', sa.JSON), sa.column('processed', sa.Integer))
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    formula_fields = connection.execute(sa.select(fields.c.table_id, tables.c.owner_id, fields.c.id).join(tables, tables.c.id == fields.c.table_id)
+                                        .where(fields.c.type == 'formula').order_by(fields.c.table_id, fields.c.id)).all()
+    field_ids_by_table = {}
+    for table_id, owner_id, field_id in formula_fields: field_ids_by_table.setdefault((table_id, owner_id), []).append(field_id)
+    if field_ids_by_table:
+        op.bulk_insert(jobs, [{"type": "formula_backfill", "status": "queued", "owner_id": owner_id, "table_id": table_id,
+                               "params": {"changed_field_ids": field_ids}, "state": {}, "processed": 0}
+                              for (table_id, owner_id), field_ids in field_ids_by_table.items()])
+
+
+def downgrade() -> None:
+    # Stored formula values stay valid; jobs not run yet are dropped
+    op.execute(jobs.delete().where(jobs.c.type == 'formula_backfill', jobs.c.status == 'queued'))
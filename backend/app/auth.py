@@ -1,26 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from . import crud, models, schemas
 from .config import settings
-from .database import get_db
+from .database import get_async_db, get_db
+from .principal_cache import Principal, get_principal
+from .read_replicas import set_request_user
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with another cost factor than BCRYPT_ROUNDS need an update, so they are rehashed on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=settings.BCRYPT_ROUNDS, bcrypt__min_rounds=settings.BCRYPT_ROUNDS, bcrypt__max_rounds=settings.BCRYPT_ROUNDS)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login") # Adjusted tokenUrl to match router prefix
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except ValueError: # Not a hash passlib recognizes
+        return False
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# bcrypt takes 100-300 ms of CPU per call, so the async endpoints run it in a bounded thread pool (bcrypt releases
+# the GIL) rather than on the event loop. Calls beyond PASSWORD_HASH_MAX_PENDING (running plus queued) get a 429.
+_password_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_hash_pending = 0 # Only changed on the event loop
+
+async def _run_password_hash(fn, *args):
+    global _password_hash_pending
+    if _password_hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many sign-ins in progress, try again shortly", headers={"Retry-After": "1"})
+    _password_hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_hash_executor, partial(fn, *args))
+    finally:
+        _password_hash_pending -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_password_hash(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    (valid, new hash): new hash is set when the password is valid but its hash uses another cost factor.
+    Without a stored hash (unknown user) a dummy verification takes the same time, so response times do not tell which emails exist.
+    """
+    if hashed_password is None:
+        await _run_password_hash(pwd_context.dummy_verify)
+        return False, None
+    try:
+        return await _run_password_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+    except ValueError: # Not a hash passlib recognizes
+        return False, None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -31,7 +72,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -46,12 +87,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = await get_principal(db, token_data.email) # Cached per process, see app/principal_cache.py
     if user is None:
         raise credentials_exception
+    set_request_user(user.id) # Read-your-writes for the request's replica reads
     return user
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     # if current_user.disabled: # If you add a disabled field to user model
     #     raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -62,7 +104,7 @@ from .permission_levels import PermissionLevel # Import Enum
 def verify_user_table_access(
     table_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     required_level: PermissionLevel = PermissionLevel.VIEWER # Default to viewer
 ) -> models.Table:
     permission = crud.get_user_table_permission_level(db, table_id=table_id, user_id=current_user.id)
@@ -0,0 +1,148 @@
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Typed Parquet / Arrow export and import of table records.
+# Each field becomes one Arrow column named after it, typed from Field.type; the column's metadata keeps the
+# field id and type. Batches are built straight from record_values rows (anything with the value_* columns as
+# attributes), one column list per field, without going through the Pydantic schemas.
+
+COLUMNAR_FORMATS = {
+    # format: (media type, file extension)
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+COLUMNAR_COMPRESSION = 'zstd'
+
+NUMBER_TYPES = ('number', 'count')
+DATETIME_TYPES = ('date', 'createdTime', 'lastModifiedTime')
+
+
+def arrow_type(field_type: str) -> pa.DataType:
+    if field_type in NUMBER_TYPES: return pa.float64()
+    if field_type == 'boolean': return pa.bool_()
+    if field_type in DATETIME_TYPES: return pa.timestamp('us', tz='UTC')
+    if field_type == 'multiSelect': return pa.list_(pa.string())
+    if field_type == 'linkToRecord': return pa.list_(pa.int64())
+    # Text-like fields; attachments as their JSON; formulas as text, since a formula may give a number or an error message
+    return pa.string()
+
+
+def arrow_schema(export_fields: List[Tuple[int, str, str]]) -> pa.Schema:
+    # export_fields: (field id, name, type) in column order, after the record_id column
+    return pa.schema([pa.field("record_id", pa.int64(), nullable=False)] + [
+        pa.field(field_name, arrow_type(field_type), metadata={"field_id": str(field_id), "field_type": field_type})
+        for field_id, field_name, field_type in export_fields
+    ])
+
+
+def _column_getter(field_type: str) -> Callable[[Any], Any]:
+    # Reads the Python value of a field type from a record_values row
+    if field_type in NUMBER_TYPES: return lambda row: row.value_number
+    if field_type == 'boolean': return lambda row: row.value_boolean
+    if field_type in DATETIME_TYPES: return lambda row: row.value_datetime
+    if field_type in ('multiSelect', 'linkToRecord'): return lambda row: row.value_json if isinstance(row.value_json, list) else None
+    if field_type == 'formula': return lambda row: str(row.value_number) if row.value_number is not None else row.value_text
+    return lambda row: json.dumps(row.value_json) if row.value_json is not None else row.value_text
+
+
+def record_batch(schema: pa.Schema, export_fields: List[Tuple[int, str, str]], records: List[Tuple[int, dict]]) -> pa.RecordBatch:
+    """One RecordBatch for (record id, {field_id: value row}) pairs, as yielded by crud.iter_table_record_values."""
+    columns = [pa.array([record_id for record_id, _ in records], type=pa.int64())]
+    for (field_id, _, field_type), arrow_field in zip(export_fields, list(schema)[1:]):
+        get_value = _column_getter(field_type)
+        values = [get_value(values_map[field_id]) if field_id in values_map else None for _, values_map in records]
+        columns.append(pa.array(values, type=arrow_field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _ChunkSink:
+    # Write-only file object collecting what a writer produced since the last take(), for streaming responses
+    def __init__(self):
+        self._chunks, self._position, self.closed = [], 0, False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data)); self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position # Total bytes written: Parquet records absolute offsets in its footer
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_columnar_bytes(format: str, schema: pa.Schema, batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """
+    Encodes batches as a Parquet file (one row group per batch) or an Arrow IPC stream, yielding the bytes
+    written for each batch, so a response can be sent while later batches are still being read.
+    """
+    sink = _ChunkSink()
+    if format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression=COLUMNAR_COMPRESSION)
+    else:
+        writer = ipc.new_stream(sink, schema, options=ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+    for batch in batches:
+        writer.write_batch(batch)
+        data = sink.take()
+        if data: yield data
+    writer.close()
+    yield sink.take() # Parquet footer or end-of-stream marker
+
+
+def iter_arrow_batches(upload, format: str, batch_size: int) -> Iterator[pa.RecordBatch]:
+    # Reads a Parquet file or an Arrow IPC stream/file one record batch at a time; the upload must be seekable for Parquet
+    if format == 'parquet':
+        yield from pq.ParquetFile(upload).iter_batches(batch_size=batch_size)
+        return
+    try:
+        reader = ipc.open_stream(upload)
+    except pa.ArrowInvalid: # Arrow IPC file format (.arrow / .feather v2) rather than a stream
+        upload.seek(0)
+        reader = ipc.open_file(upload)
+        for index in range(reader.num_record_batches): yield reader.get_batch(index)
+        return
+    yield from reader
+
+
+def _value_converter(field_type: str, arrow_field_type: pa.DataType) -> Optional[Callable[[Any], Any]]:
+    # Converts a non-null Python value of an imported column for crud; None when no conversion is needed
+    if field_type == 'attachment' and pa.types.is_string(arrow_field_type): return json.loads # Attachments are exported as JSON
+    if field_type in NUMBER_TYPES + ('boolean',) + DATETIME_TYPES + ('multiSelect', 'linkToRecord'): return None # Typed columns; crud validates them
+    if pa.types.is_string(arrow_field_type) or pa.types.is_large_string(arrow_field_type): return None
+    return str
+
+
+def iter_columnar_rows(upload, format: str, field_map: Dict[str, Any], errors: list, batch_size: int = 1000) -> Iterator[Tuple[int, dict]]:
+    """
+    Yields (row number, {field_id: value}) for crud.import_records from a Parquet or Arrow upload, rows numbered from 1.
+    Columns are matched to fields by name (record_id and unknown columns are ignored); values that cannot be read are appended to errors.
+    """
+    row_number = 0
+    for batch in iter_arrow_batches(upload, format, batch_size):
+        columns = [(field_map[name].id, name, batch.column(index).to_pylist(), _value_converter(field_map[name].type, batch.schema.field(index).type))
+                   for index, name in enumerate(batch.schema.names) if name in field_map]
+        for row_index in range(batch.num_rows):
+            row_number += 1
+            if not columns:
+                errors.append({"row": row_number, "error": "No data found for any known fields in this row."})
+                continue
+            record_values_payload: Dict[int, Any] = {}
+            try:
+                for field_id, name, values, convert in columns:
+                    value = values[row_index]
+                    record_values_payload[field_id] = convert(value) if convert is not None and value is not None else value
+            except ValueError as ve: # json.JSONDecodeError is a ValueError
+                errors.append({"row": row_number, "field": name, "error": str(ve)})
+                continue
+            yield row_number, record_values_payload
@@ -5,6 +5,34 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    METRICS_ENABLED: bool = False # Serve GET /metrics (cache stats, DB pool gauges) without authentication; enable only behind an internal bind or proxy
+    DATABASE_REPLICA_URLS: str = "" # Comma-separated read replica URLs; GET requests and exports read from them (empty: everything on DATABASE_URL)
+    REPLICA_READ_YOUR_WRITES_SECONDS: int = 5 # After a user's write, their reads stay on the primary this long (longer than the replica lag)
+    DB_POOL_SIZE: int = 10 # Connections kept open per engine (the sync and the async engine each have a pool) per process
+    DB_MAX_OVERFLOW: int = 20 # Extra connections opened beyond DB_POOL_SIZE under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: int = 30 # Wait for a free connection before the request fails
+    DB_POOL_RECYCLE_SECONDS: int = 1800 # Connections older than this are replaced on checkout (-1: never)
+    DB_POOL_PRE_PING: bool = True # Test connections on checkout, so connections dropped by a failover or restart are replaced instead of failing a request
+    DB_STATEMENT_TIMEOUT_MS: int = 0 # PostgreSQL statement_timeout of every connection (0: none)
+    SQLITE_JOURNAL_MODE: str = "WAL" # SQLite profile for embedded deployments: readers do not block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL" # Safe with WAL; fsync at checkpoints instead of every commit
+    SQLITE_MMAP_SIZE: int = 268435456 # Bytes of the database file read through mmap (0: off)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000 # Wait for a lock held by another connection before "database is locked"
+    BCRYPT_ROUNDS: int = 12 # bcrypt cost factor of new password hashes; existing hashes are rehashed on login when it changes
+    PASSWORD_HASH_WORKERS: int = 4 # Threads hashing/verifying passwords at once per process
+    PASSWORD_HASH_MAX_PENDING: int = 64 # Hashes running or queued per process before sign-ins and sign-ups get a 429
+    RECORDS_BATCH_MAX_SIZE: int = 1000 # Max records per /tables/{table_id}/records:batch call
+    RECORDS_STREAM_CHUNK_SIZE: int = 1000 # Records read per chunk by records:stream, and inserted per transaction by records:ingest
+    CSV_EXPORT_CHUNK_SIZE: int = 1000 # Records read and written per chunk by the streaming CSV export
+    CSV_IMPORT_CHUNK_SIZE: int = 1000 # Rows inserted per transaction by the CSV import
+    COLUMNAR_BATCH_SIZE: int = 10000 # Records per Arrow record batch (and Parquet row group) in Parquet/Arrow exports
+    JOBS_MAX_WORKERS: int = 2 # Background jobs (imports, exports, backfills, deletes) running at once per process
+    JOBS_STALE_AFTER_SECONDS: int = 300 # A running job without a checkpoint for this long is resumed on startup
+    PERMISSION_CACHE_TTL_SECONDS: int = 10 # Cached table permission levels are resolved again after this long (changes made by other processes)
+    PERMISSION_CACHE_MAX_ENTRIES: int = 100000 # (user, table) pairs kept per process
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30 # Authenticated users are looked up again after this long (user changes made by other processes)
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000 # Token subjects kept per process, least recently used dropped first
+    SCHEMA_CACHE_TTL_SECONDS: int = 60 # Cached table schemas are reloaded after this long (field changes made by other processes)
 
     class Config:
         env_file = ".env"
@@ -1,12 +1,137 @@
-from sqlalchemy import create_engine
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from . import read_replicas
 from .config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class PoolWaitStats:
+    # Time spent in pool.connect(): waiting for a free connection, opening a new one and the pre-ping
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"waiting": self.waiting, "checkouts": self.checkouts, "timeouts": self.timeouts,
+                    "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.checkouts, 3) if self.checkouts else None,
+                    "wait_ms_max": round(self.wait_seconds_max * 1000, 3)}
+
+
+def _timed_pool_class(pool_class):
+    class TimedPool(pool_class):
+        wait_stats = PoolWaitStats() # On the class: the pool engine.dispose() creates (a copy of this one) keeps counting
+
+        def connect(self):
+            stats = self.wait_stats
+            with stats._lock: stats.waiting += 1
+            started = time.perf_counter()
+            timed_out = False
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                waited = time.perf_counter() - started
+                with stats._lock:
+                    stats.waiting -= 1; stats.checkouts += 1; stats.timeouts += timed_out
+                    stats.wait_seconds_total += waited; stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+
+    TimedPool.__name__ = "Timed" + pool_class.__name__
+    return TimedPool
+
+
+def engine_options(database_url) -> dict:
+    """
+    create_engine / create_async_engine keyword arguments from the DB_POOL_* and DB_STATEMENT_TIMEOUT_MS settings.
+    Pool sizing only applies to queue pools: in-memory SQLite keeps its single shared connection.
+    """
+    url = make_url(database_url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    pool_class = url.get_dialect().get_pool_class(url)
+    if issubclass(pool_class, QueuePool):
+        options.update(poolclass=_timed_pool_class(pool_class), pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                       pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS, pool_recycle=settings.DB_POOL_RECYCLE_SECONDS)
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        if url.get_driver_name() == "asyncpg": options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else: options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def configure_engine(engine) -> None:
+    # The SQLite profile (SQLITE_* settings), applied to every new connection
+    if engine.dialect.name != "sqlite": return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}") # In-memory databases stay "memory"
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.close()
+
+
+def create_configured_engine(database_url):
+    configured_engine = create_engine(database_url, **engine_options(database_url))
+    configure_engine(configured_engine)
+    return configured_engine
+
+
+# Optional read replicas (DATABASE_REPLICA_URLS). Sessions doing read-only work, i.e. those of GET requests and
+# of exports, send their SELECTs to a replica (one per session, picked at random); writes go to the primary, and
+# so does every later statement of a session that has written. Reads stay on the primary for the user's own
+# writes (see read_replicas.py) and for statements with execution option READ_PRIMARY (cache loads: a lagging
+# replica must not fill a process cache with what was just changed).
+READ_PRIMARY = {"read_primary": True}
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+engine = create_configured_engine(SQLALCHEMY_DATABASE_URL)
+replica_engines = [create_configured_engine(url) for url in REPLICA_URLS]
+
+
+class RoutingSession(Session):
+    """
+    Session routing reads to replicas. info["read_only"] marks a session as read-only work (default: the current
+    request is a GET); info["user_id"] is the user whose writes it must see (default: the request's user).
+    """
+    replicas: list = replica_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["wrote"] = self.info["uncommitted_write"] = True
+        elif self.replicas and self._reads_from_replica(clause):
+            return self.replicas[self.info.setdefault("replica", random.randrange(len(self.replicas)))]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _reads_from_replica(self, clause) -> bool:
+        if clause is None or not clause.is_select or self.info.get("wrote"): return False
+        if clause.get_execution_options().get("read_primary"): return False
+        routing = read_replicas.current_routing()
+        if not self.info.get("read_only", routing is not None and routing.read_only): return False
+        return not read_replicas.must_read_primary(self.info.get("user_id"))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    if session.info.pop("uncommitted_write", False): read_replicas.record_write(session.info.get("user_id"))
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
 
 Base = declarative_base()
 
@@ -16,3 +141,60 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async engine for the async endpoints: queries are awaited on the event loop instead of blocking it.
+# Same database as engine, through an async driver (asyncpg for PostgreSQL, aiosqlite for SQLite).
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(database_url: str):
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS: return url # Already an async driver URL (or one without a known async driver)
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def create_configured_async_engine(database_url):
+    configured_engine = create_async_engine(async_database_url(database_url), **engine_options(async_database_url(database_url)))
+    configure_engine(configured_engine.sync_engine)
+    return configured_engine
+
+
+async_engine = create_configured_async_engine(SQLALCHEMY_DATABASE_URL)
+async_replica_engines = [create_configured_async_engine(url) for url in REPLICA_URLS]
+
+
+class AsyncRoutingSession(RoutingSession):
+    # The sync session inside AsyncSessionLocal's sessions: binds to the sync side of the async replica engines
+    replicas = [replica.sync_engine for replica in async_replica_engines]
+
+
+# expire_on_commit=False: objects returned by crud stay readable after the commit, without a lazy (blocking) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncRoutingSession)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Runs fn(session, *args, **kwargs), synchronous crud code, on an AsyncSession through run_sync (each query is
+    awaited on the event loop, in a greenlet), or directly on a Session (jobs, scripts and tests).
+    """
+    if isinstance(db, AsyncSession): return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
+
+def pool_stats() -> dict:
+    """
+    Live gauges of both connection pools for sizing DB_POOL_SIZE/DB_MAX_OVERFLOW against the number of workers:
+    connections checked out and idle, overflow in use, and the time requests spent getting a connection.
+    """
+    stats = {}
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    for index, (replica, async_replica) in enumerate(zip(replica_engines, async_replica_engines)):
+        pools += [(f"replica_{index}_sync", replica.pool), (f"replica_{index}_async", async_replica.sync_engine.pool)]
+    for name, pool in pools:
+        if not isinstance(pool, QueuePool):
+            stats[name] = {"pool": type(pool).__name__}
+            continue
+        stats[name] = {"pool": type(pool).__name__, "size": pool.size(), "checked_out": pool.checkedout(), "checked_in": pool.checkedin(),
+                       "overflow": max(pool.overflow(), 0), **pool.wait_stats.as_dict()}
+    return stats
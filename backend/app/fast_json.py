@@ -0,0 +1,23 @@
+import orjson
+from starlette.responses import Response
+
+# orjson encoding for the record read paths, which build plain dicts (crud._record_dict) instead of schemas.Record.
+# The output is the JSON FastAPI writes for the response_model: UTC datetimes end in "Z" as with pydantic,
+# and inf/nan numbers (e.g. a formula dividing by zero) become null.
+
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=JSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """
+    Returned directly by an endpoint, so FastAPI does not validate and re-encode the content against its
+    response_model (kept on the route for the OpenAPI schema); the content must already have that shape.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
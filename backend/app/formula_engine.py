@@ -1,5 +1,14 @@
+import ast
 import re
 import math # For potentially safe math functions if allowed later
+import operator
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Float, case, literal, null
+from sqlalchemy.sql.elements import ColumnElement
 
 # For a safer eval, one might use a library like 'asteval' or 'numexpr'.
 # Since direct eval is risky, we'll try to create a very restricted environment.
@@ -35,108 +44,358 @@ def get_field_value_from_map(field_id_str: str, record_values_map: dict, field_d
         # For now, let's treat as None, which might become 0 for numeric ops or cause type errors
         return None
 
+    return get_typed_value(value_obj, field_def.type)
+
+
+def get_typed_value(value_obj, field_type: str):
     # Based on field type, extract the correct value
     # This logic should mirror how values are stored/retrieved
-    if field_def.type == 'number' or field_def.type == 'count':
+    if field_type == 'number' or field_type == 'count':
         return value_obj.value_number
-    elif field_def.type == 'boolean':
+    elif field_type == 'boolean':
         return float(value_obj.value_boolean) if value_obj.value_boolean is not None else None # Convert boolean to 0/1 for math
+    elif field_type == 'formula': # Stored formula result: a number, or an error string in value_text
+        return value_obj.value_number if value_obj.value_number is not None else value_obj.value_text
     # Add other type conversions if necessary (e.g., date differences)
     # For now, mainly supporting numeric operations.
     # If a text field is referenced, it will likely cause an error in eval if used with arithmetic ops.
     return value_obj.value_text # Fallback, or could be None if not text-based
 
 
+class FormulaError(Exception):
+    pass
+
+
+# --- Compiled formulas ---
+# A formula is parsed and validated once into a code object built from a whitelisted AST,
+# so evaluating it for a record only binds the referenced field values and runs the code.
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\d+)\}")
+ALLOWED_CHARS_PATTERN = re.compile(r"^[0-9\.\s\(\)\+\-\*\/]*$") # Same character set evaluate_formula accepts
+
+ALLOWED_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Pow)
+ALLOWED_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+def _placeholder_name(field_id: int) -> str:
+    return f"_f{field_id}"
+
+
+class CompiledFormula:
+    """
+    A formula string parsed and validated once.
+    field_ids: ids of the fields referenced by {ID} placeholders, in order of first appearance.
+    error: error string returned for every evaluation if the formula itself is invalid.
+    """
+    __slots__ = ("formula_string", "field_ids", "error", "tree", "is_vectorizable", "_code", "_names")
+
+    def __init__(self, formula_string: str, field_ids: Tuple[int, ...] = (), error: Optional[str] = None, tree: Optional[ast.Expression] = None):
+        self.formula_string = formula_string
+        self.field_ids = field_ids
+        self.error = error
+        self.tree = tree
+        self._code = compile(tree, "<formula>", "eval") if tree is not None and error is None else None
+        self._names = tuple((field_id, _placeholder_name(field_id)) for field_id in field_ids)
+        self.is_vectorizable = self._code is not None and _is_vectorizable(tree)
+
+    @property
+    def is_valid(self) -> bool:
+        return self.error is None
+
+    def evaluate(self, record_values_map: dict, field_defs_map: dict) -> any:
+        """Same contract as evaluate_formula: returns a number, an error string, or None for an empty formula."""
+        if self.error is not None:
+            return self.error
+        if self._code is None:
+            return None
+
+        bindings = {}
+        for field_id, name in self._names:
+            value = get_field_value_from_map(f"field_{field_id}", record_values_map, field_defs_map)
+            if not value: # Missing values (and empty text) are treated as 0, as in evaluate_formula
+                value = 0
+            elif not isinstance(value, (int, float)):
+                try:
+                    value = float(value)
+                except (ValueError, TypeError):
+                    return "Error: Invalid characters in formula"
+            bindings[name] = value
+        return self.evaluate_bindings(bindings)
+
+    def evaluate_bindings(self, bindings: Dict[str, float]) -> any:
+        try:
+            result = eval(self._code, {"__builtins__": {}}, bindings) # Code object built from a validated AST only
+        except ZeroDivisionError:
+            return "Error: Division by zero"
+        except TypeError:
+            return "Error: Type error in formula (e.g., mixing text and numbers)"
+        except Exception as e:
+            print(f"Formula evaluation error: {e} for formula '{self.formula_string}'")
+            return "Error: Formula evaluation failed"
+        if isinstance(result, (int, float)):
+            return result
+        return "Error: Formula result is not a number"
+
+
+def _validate_formula_node(node: ast.AST, allowed_names: set) -> Optional[str]:
+    """Returns an error string for the first node outside the supported arithmetic subset."""
+    if isinstance(node, ast.Expression):
+        return _validate_formula_node(node.body, allowed_names)
+    if isinstance(node, ast.BinOp):
+        if not isinstance(node.op, ALLOWED_BINARY_OPERATORS):
+            return "Error: Invalid characters in formula"
+        return _validate_formula_node(node.left, allowed_names) or _validate_formula_node(node.right, allowed_names)
+    if isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, ALLOWED_UNARY_OPERATORS):
+            return "Error: Invalid characters in formula"
+        return _validate_formula_node(node.operand, allowed_names)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            return "Error: Formula result is not a number" # e.g. "..." parses to Ellipsis
+        return None
+    if isinstance(node, ast.Name):
+        return None if node.id in allowed_names and isinstance(node.ctx, ast.Load) else "Error: Invalid characters in formula"
+    if isinstance(node, ast.Tuple):
+        return "Error: Formula result is not a number" # "()" is the only tuple the allowed characters can spell
+    if isinstance(node, ast.Call):
+        return "Error: Type error in formula (e.g., mixing text and numbers)" # e.g. "2(3)", a number is not callable
+    return "Error: Invalid characters in formula"
+
+
+def compile_formula(formula_string: str) -> CompiledFormula:
+    """Parses and validates a formula string like "{12} * ({13} + 1)" into a CompiledFormula."""
+    if not formula_string:
+        return CompiledFormula(formula_string)
+
+    field_ids = tuple(dict.fromkeys(int(field_id) for field_id in PLACEHOLDER_PATTERN.findall(formula_string)))
+    if not ALLOWED_CHARS_PATTERN.match(PLACEHOLDER_PATTERN.sub("0", formula_string)):
+        return CompiledFormula(formula_string, field_ids, error="Error: Invalid characters in formula")
+
+    source = PLACEHOLDER_PATTERN.sub(lambda m: f" {_placeholder_name(int(m.group(1)))} ", formula_string)
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError:
+        return CompiledFormula(formula_string, field_ids, error="Error: Syntax error in formula")
+
+    error = _validate_formula_node(tree, {_placeholder_name(field_id) for field_id in field_ids})
+    return CompiledFormula(formula_string, field_ids, error=error, tree=tree)
+
+
+# Compiled formulas for formula fields, keyed by field id. An entry is only reused while
+# the stored formula text matches, and crud invalidates it when the field changes.
+_field_formula_cache: Dict[int, CompiledFormula] = {}
+
+
+def get_compiled_formula(field_id: int, formula_string: str) -> CompiledFormula:
+    compiled = _field_formula_cache.get(field_id)
+    if compiled is None or compiled.formula_string != formula_string:
+        compiled = compile_formula(formula_string)
+        _field_formula_cache[field_id] = compiled
+    return compiled
+
+
+def invalidate_compiled_formula(field_id: int) -> None:
+    _field_formula_cache.pop(field_id, None)
+
+
+@lru_cache(maxsize=256)
+def _compile_formula_cached(formula_string: str) -> CompiledFormula:
+    return compile_formula(formula_string)
+
+
 def evaluate_formula(formula_string: str, record_values_map: dict, field_defs_map: dict) -> any:
     """
     Evaluates a formula string.
     record_values_map: {field_id_int: RecordValue object, ...}
     field_defs_map: {field_id_int: Field object (for type info), ...}
+    Callers evaluating a formula field for many records should use get_compiled_formula instead.
     """
     if not formula_string:
         return None
+    return _compile_formula_cached(formula_string).evaluate(record_values_map, field_defs_map)
+
+
+# --- Column-at-a-time evaluation ---
+# For a page of records, each referenced field is gathered into one float64 array and the
+# formula runs once over the arrays. Results (including error strings) are the same as
+# evaluating the formula record by record.
+
+VECTORIZED_BINARY_OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide, ast.FloorDiv: np.floor_divide}
+VECTORIZED_UNARY_OPERATORS = {ast.UAdd: np.positive, ast.USub: np.negative}
+
+
+def _is_vectorizable(tree: ast.Expression) -> bool:
+    # ** is left to the per-record path: Python raises on overflow or complex results where NumPy returns inf/nan
+    return not any(isinstance(node, ast.BinOp) and type(node.op) not in VECTORIZED_BINARY_OPERATORS for node in ast.walk(tree))
+
+
+def _evaluate_node_columns(node: ast.AST, columns: Dict[str, np.ndarray]):
+    """Returns (values, division_by_zero_mask) for a validated formula AST node."""
+    if isinstance(node, ast.Name):
+        return columns[node.id], False
+    if isinstance(node, ast.Constant):
+        return np.float64(node.value), False
+    if isinstance(node, ast.UnaryOp):
+        operand, zero_division = _evaluate_node_columns(node.operand, columns)
+        return VECTORIZED_UNARY_OPERATORS[type(node.op)](operand), zero_division
+    left, left_zero_division = _evaluate_node_columns(node.left, columns)
+    right, right_zero_division = _evaluate_node_columns(node.right, columns)
+    zero_division = np.logical_or(left_zero_division, right_zero_division)
+    if isinstance(node.op, (ast.Div, ast.FloorDiv)):
+        zero_division = np.logical_or(zero_division, right == 0)
+    return VECTORIZED_BINARY_OPERATORS[type(node.op)](left, right), zero_division
 
-    # 1. Replace placeholders like {field_123} with their actual values
-    def replace_placeholder(match):
-        placeholder = match.group(0) # e.g., {field_123}
-        field_id_str_token = placeholder.strip('{}') # e.g., field_123
-
-        value = get_field_value_from_map(field_id_str_token, record_values_map, field_defs_map)
-
-        if value is None:
-            # If a referenced field has no value, it's problematic for most ops.
-            # Could default to 0 for numeric, or raise specific error.
-            # For now, returning "None" as string which will likely fail eval safely or be handled by it.
-            return "None"
-
-        # Ensure the value is a string representation of a number for safe eval,
-        # or if strings are allowed in formulas, ensure proper quoting (not handled here yet).
-        # For now, assuming numeric context.
-        if isinstance(value, (int, float)):
-            return str(value)
-        else:
-            # Attempt to convert to float if possible (e.g. from string number)
+
+def _integral_node_columns(node: ast.AST, integral_columns: Dict[str, np.ndarray]):
+    """Where Python would compute an int (int operands, no true division): the per-record path returns ints there."""
+    if isinstance(node, ast.Name):
+        return integral_columns[node.id]
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, int)
+    if isinstance(node, ast.UnaryOp):
+        return _integral_node_columns(node.operand, integral_columns)
+    if isinstance(node.op, ast.Div):
+        return False
+    return np.logical_and(_integral_node_columns(node.left, integral_columns), _integral_node_columns(node.right, integral_columns))
+
+
+def evaluate_formula_batch(compiled: CompiledFormula, record_values_maps: List[dict], field_defs_map: dict) -> list:
+    """
+    Evaluates a compiled formula for many records at once.
+    record_values_maps: one {field_id_int: RecordValue object} map per record.
+    Returns one result per record, as CompiledFormula.evaluate would.
+    """
+    count = len(record_values_maps)
+    if compiled.error is not None:
+        return [compiled.error] * count
+    if compiled._code is None:
+        return [None] * count
+    if not compiled.is_vectorizable or count == 0:
+        return [compiled.evaluate(values_map, field_defs_map) for values_map in record_values_maps]
+
+    columns, integral_columns = {}, {}
+    invalid = np.zeros(count, dtype=bool)
+    for field_id, name in compiled._names:
+        column = np.zeros(count, dtype=np.float64) # Missing values are treated as 0
+        integral = np.ones(count, dtype=bool) # ... the int 0
+        columns[name], integral_columns[name] = column, integral
+        field_def = field_defs_map.get(field_id)
+        if field_def is None:
+            continue
+        field_type = field_def.type
+        for row, values_map in enumerate(record_values_maps):
+            value_obj = values_map.get(field_id)
+            if value_obj is None:
+                continue
+            value = get_typed_value(value_obj, field_type)
+            if not value:
+                continue
+            integral[row] = isinstance(value, int)
             try:
-                return str(float(value))
+                column[row] = float(value)
             except (ValueError, TypeError):
-                 # If it's not a number, this basic engine won't handle it well with arithmetic.
-                 # Returning it as "None" or raising an error might be options.
-                 # This part needs to be more robust if non-numeric fields are used in formulas.
-                return "None" # Or raise FormulaError(f"Field {field_id_str_token} has non-numeric value '{value}'")
-
-
-    # Regex to find placeholders like {field_XXX}
-    # Using a simpler {field_id} format as per problem description
-    # Formula string will use placeholders like "{field_id_1} + {field_id_2}"
-    # The problem states "{field_id_X}", let's use that.
-    # For the actual replacement, we need to map "field_id_X" to the actual integer field_id.
-    # This example assumes formula_string uses actual IDs like "{123} + {456}"
-    # Let's adjust to the prompt's "{field_id_X}" - this means the formula string itself
-    # must be created with these symbolic names, or we use a regex that captures the ID.
-    # For simplicity, let's assume formula string uses actual IDs: e.g., "{1} + {2}"
-
-    # Simpler placeholder: {ID}, e.g., "{123} + {456}"
-    processed_formula = re.sub(r"\{(\d+)\}", lambda m: str(get_field_value_from_map(f"field_{m.group(1)}", record_values_map, field_defs_map) or 0), formula_string)
-
-    # Security: Validate the processed_formula to ensure it only contains allowed characters/operations
-    # This is a very basic check, a proper tokenizer/parser is better.
-    allowed_chars_pattern = r"^[0-9\.\s\(\)\+\-\*\/]*$" # Allows numbers, dots, spaces, parens, and basic operators
-    if not re.match(allowed_chars_pattern, processed_formula):
-        # Additionally, check for functions if we allow them
-        # For now, strictly arithmetic.
-        return "Error: Invalid characters in formula"
-
-    # 2. Evaluate the processed formula string in a restricted environment
-    try:
-        # WARNING: eval() is dangerous. This is a simplified example.
-        # A real implementation should use a safer evaluation library (e.g., asteval)
-        # or a custom parser for the specific allowed operations.
-        # For this basic step, we are using it with heavy caveats.
+                invalid[row] = True # Non-numeric text, same as "Error: Invalid characters in formula"
 
-        # Create a limited scope for eval
-        # No builtins are passed, only allowed names (math constants/functions if any)
-        # This still doesn't make eval fully safe from all exploits (e.g., resource exhaustion).
-        scope = {"__builtins__": {}}
-        # Add any allowed functions/constants to scope here if using them
-        # scope.update(ALLOWED_NAMES)
+    with np.errstate(all="ignore"):
+        values, zero_division = _evaluate_node_columns(compiled.tree.body, columns)
+    results = np.broadcast_to(values, (count,)).tolist()
+    zero_division = np.broadcast_to(zero_division, (count,))
+    integral = np.broadcast_to(_integral_node_columns(compiled.tree.body, integral_columns), (count,))
+    for row in np.flatnonzero(integral & ~(invalid | zero_division)):
+        # Beyond 2**53 a float64 no longer holds the exact int Python would compute
+        results[row] = int(results[row]) if abs(results[row]) < 2 ** 53 else compiled.evaluate(record_values_maps[row], field_defs_map)
+    for row in np.flatnonzero(invalid | zero_division):
+        results[row] = "Error: Invalid characters in formula" if invalid[row] else "Error: Division by zero"
+    return results
 
-        result = eval(processed_formula, scope, {}) # No locals passed either
 
-        if isinstance(result, (int, float)):
-            return result
-        else:
-            return "Error: Formula result is not a number"
+# --- Dependency graph ---
+# Formula results are stored in record_values, so a write only needs to recompute the
+# formulas that (directly or through other formulas) read one of the changed fields.
 
-    except ZeroDivisionError:
-        return "Error: Division by zero"
-    except SyntaxError:
-        return "Error: Syntax error in formula"
-    except TypeError:
-        return "Error: Type error in formula (e.g., mixing text and numbers)"
-    except Exception as e:
-        # Log the full error for debugging, but return a generic error to user
-        print(f"Formula evaluation error: {e} for formula '{processed_formula}'")
-        return "Error: Formula evaluation failed"
+CIRCULAR_REFERENCE_ERROR = "Error: Circular reference in formula"
 
-class FormulaError(Exception):
-    pass
+
+class FormulaDependencyGraph:
+    """
+    {formula_field_id: {referenced field_id}} for the formula fields of one table.
+    order: formula field ids sorted so every formula comes after the formulas it reads.
+    cyclic: formula field ids that are part of (or depend on) a reference cycle.
+    """
+
+    def __init__(self, formulas: Dict[int, CompiledFormula]):
+        self.formulas = formulas
+        self.inputs: Dict[int, Set[int]] = {field_id: set(compiled.field_ids) for field_id, compiled in formulas.items()}
+        self.dependents: Dict[int, Set[int]] = defaultdict(set)
+        for field_id, input_ids in self.inputs.items():
+            for input_id in input_ids:
+                self.dependents[input_id].add(field_id)
+        self.order, self.cyclic = self._topological_order()
+
+    def _topological_order(self) -> Tuple[List[int], Set[int]]:
+        pending = {field_id: len(input_ids & self.formulas.keys()) for field_id, input_ids in self.inputs.items()}
+        ready = sorted(field_id for field_id, count in pending.items() if count == 0)
+        order = []
+        while ready:
+            field_id = ready.pop()
+            order.append(field_id)
+            for dependent_id in self.dependents.get(field_id, ()):
+                pending[dependent_id] -= 1
+                if pending[dependent_id] == 0:
+                    ready.append(dependent_id)
+        cyclic = set(self.formulas) - set(order)
+        return order + sorted(cyclic), cyclic
+
+    def affected_by(self, field_ids: Iterable[int]) -> List[int]:
+        """Formula field ids to recompute, in evaluation order, when the given fields change (formula fields in field_ids included)."""
+        affected = set()
+        stack = list(field_ids)
+        for field_id in stack:
+            if field_id in self.formulas:
+                affected.add(field_id)
+        while stack:
+            for dependent_id in self.dependents.get(stack.pop(), ()):
+                if dependent_id not in affected:
+                    affected.add(dependent_id)
+                    stack.append(dependent_id)
+        return [field_id for field_id in self.order if field_id in affected]
+
+
+# --- SQL translation ---
+# Arithmetic formulas can be expressed as SQL over the referenced record_values columns, so
+# filters and sorts on formula fields can run in the database. Division by zero becomes NULL.
+
+SQL_BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul}
+
+
+def formula_to_sql(compiled: CompiledFormula, column_for_field: Callable[[int], Optional[ColumnElement]]) -> Optional[ColumnElement]:
+    """
+    Translates a compiled formula into a SQLAlchemy expression, or returns None if it cannot be
+    expressed in SQL with the same results (e.g. ** or //, or a referenced field that is not numeric).
+    column_for_field(field_id): numeric expression for a referenced field with missing values as 0, or None.
+    """
+    if compiled.error is not None or compiled.tree is None:
+        return None
+    return _node_to_sql(compiled.tree.body, column_for_field)
+
+
+def _node_to_sql(node: ast.AST, column_for_field) -> Optional[ColumnElement]:
+    if isinstance(node, ast.Name):
+        return column_for_field(int(node.id[len("_f"):]))
+    if isinstance(node, ast.Constant):
+        return literal(float(node.value), Float)
+    if isinstance(node, ast.UnaryOp):
+        operand = _node_to_sql(node.operand, column_for_field)
+        if operand is None:
+            return None
+        return -operand if isinstance(node.op, ast.USub) else operand
+    if not isinstance(node, ast.BinOp):
+        return None
+    left = _node_to_sql(node.left, column_for_field)
+    right = _node_to_sql(node.right, column_for_field)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, ast.Div):
+        return case((right == 0, null()), else_=left / right)
+    sql_operator = SQL_BINARY_OPERATORS.get(type(node.op))
+    return sql_operator(left, right) if sql_operator else None
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .websocket_manager import get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+# Background jobs: long imports, exports, formula backfills and large deletes run outside the request.
+# A job is a row in the jobs table; its handler runs in a worker thread, commits its work chunk by chunk
+# together with a checkpoint (job.state), and reports progress to the table's WebSocket room.
+# Jobs left queued or running by a stopped process are resumed from their last checkpoint on startup.
+
+JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+JOB_HANDLERS: Dict[str, Callable[['JobContext'], Optional[dict]]] = {}
+
+# Files of import and export jobs (the saved upload, the export being written), next to the uploaded files
+JOBS_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "uploads", "jobs"))
+
+_executor = ThreadPoolExecutor(max_workers=settings.JOBS_MAX_WORKERS, thread_name_prefix="job")
+
+
+def job_handler(job_type: str):
+    """Registers the function running jobs of job_type. It receives a JobContext and returns the job's result dict."""
+    def register(handler):
+        JOB_HANDLERS[job_type] = handler
+        return handler
+    return register
+
+
+class JobContext:
+    """What a handler sees of its job: params, the last checkpoint (state), and commit_chunk to save progress."""
+
+    def __init__(self, job: models.Job, loop: Optional[asyncio.AbstractEventLoop]):
+        self.job_id = job.id
+        self.job_type = job.type
+        self.table_id = job.table_id
+        self.owner_id = job.owner_id
+        self.params = dict(job.params or {})
+        self.state = dict(job.state or {})
+        self.processed = job.processed or 0
+        self.total = job.total
+        self._loop = loop
+        self._run_started = time.monotonic()
+        self._processed_at_start = self.processed
+
+    def commit_chunk(self, db: Session, processed: int, total: Optional[int] = None, **state):
+        # Saves the checkpoint in the same transaction as the chunk's work, so a resumed job continues exactly after it
+        self.processed = processed
+        if total is not None: self.total = total
+        self.state.update(state)
+        db.query(models.Job).filter(models.Job.id == self.job_id).update({models.Job.processed: self.processed, models.Job.total: self.total, models.Job.state: self.state, models.Job.updated_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+        self.broadcast(self.progress_event(JOB_RUNNING))
+
+    def progress_event(self, status: str) -> dict:
+        elapsed = time.monotonic() - self._run_started
+        rows_per_second = (self.processed - self._processed_at_start) / elapsed if elapsed > 0 else None
+        eta_seconds = (self.total - self.processed) / rows_per_second if rows_per_second and self.total is not None else None
+        return {"event": "job_progress", "data": {"job_id": self.job_id, "type": self.job_type, "table_id": self.table_id, "status": status, "processed": self.processed, "total": self.total,
+                                                  "rows_per_second": round(rows_per_second, 1) if rows_per_second is not None else None, "eta_seconds": round(eta_seconds, 1) if eta_seconds is not None else None}}
+
+    def broadcast(self, message: dict):
+        # Handlers run in worker threads; the send happens on the event loop the job was submitted from
+        # Progress is best effort: a job keeps running (and stays resumable) when its loop has gone away
+        if self._loop is None or self._loop.is_closed() or self.table_id is None: return
+        coroutine = get_connection_manager().broadcast_json_to_room(message, f"table_{self.table_id}")
+        try:
+            asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        except RuntimeError: # The loop closed in between
+            coroutine.close()
+
+
+def create_job(db: Session, job_type: str, owner_id: int, table_id: Optional[int] = None, params: Optional[dict] = None) -> models.Job:
+    if job_type not in JOB_HANDLERS: raise ValueError(f"Unknown job type '{job_type}'")
+    db_job = models.Job(type=job_type, status=JOB_QUEUED, owner_id=owner_id, table_id=table_id, params=params or {}, state={}, processed=0)
+    db.add(db_job); db.commit(); db.refresh(db_job)
+    return db_job
+
+
+def get_job(db: Session, job_id: int, user_id: int) -> Optional[models.Job]:
+    return db.query(models.Job).filter(models.Job.id == job_id, models.Job.owner_id == user_id).first()
+
+
+async def submit_job(job_id: int):
+    """Runs a queued job in the worker pool without waiting for it (usable as a BackgroundTasks task)."""
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(_executor, run_job, job_id, loop)
+
+
+def run_job(job_id: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+    db = SessionLocal()
+    try:
+        # Claim the job; another worker may have picked it up already
+        claimed = db.query(models.Job).filter(models.Job.id == job_id, models.Job.status == JOB_QUEUED).update({models.Job.status: JOB_RUNNING, models.Job.started_at: datetime.now(timezone.utc), models.Job.updated_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        db.commit()
+        if not claimed: return
+        db_job = db.query(models.Job).filter(models.Job.id == job_id).first()
+        context = JobContext(db_job, loop)
+        context.broadcast(context.progress_event(JOB_RUNNING))
+        try:
+            result = JOB_HANDLERS[db_job.type](context)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, db_job.type)
+            db.rollback()
+            _finish_job(db, job_id, JOB_FAILED, error=str(e))
+            context.broadcast(context.progress_event(JOB_FAILED))
+            return
+        _finish_job(db, job_id, JOB_SUCCEEDED, result=result)
+        context.broadcast(context.progress_event(JOB_SUCCEEDED))
+    finally:
+        db.close()
+
+
+def _finish_job(db: Session, job_id: int, status: str, result: Optional[Any] = None, error: Optional[str] = None):
+    db.query(models.Job).filter(models.Job.id == job_id).update({models.Job.status: status, models.Job.result: result, models.Job.error: error, models.Job.finished_at: datetime.now(timezone.utc), models.Job.updated_at: datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+
+
+def requeue_interrupted_jobs(stale_after_seconds: int) -> list:
+    """
+    Returns the ids of jobs to run after a restart: queued jobs, and running jobs whose last checkpoint is older
+    than stale_after_seconds (their process stopped; a live worker checkpoints more often). Those are queued again.
+    """
+    db = SessionLocal()
+    try:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)
+        db.query(models.Job).filter(models.Job.status == JOB_RUNNING, models.Job.updated_at < stale_before).update({models.Job.status: JOB_QUEUED}, synchronize_session=False)
+        db.commit()
+        return [job_id for (job_id,) in db.query(models.Job.id).filter(models.Job.status == JOB_QUEUED).order_by(models.Job.id).all()]
+    finally:
+        db.close()
+
+
+async def resume_jobs():
+    for job_id in requeue_interrupted_jobs(settings.JOBS_STALE_AFTER_SECONDS):
+        logger.info("Resuming job %s", job_id)
+        await submit_job(job_id)
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON, Text, Float, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON, Text, Float, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from .database import Base
+from .database import Base as DeclarativeBase # models.Base is the bases table
 
-class User(Base):
+class User(DeclarativeBase):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -19,7 +19,7 @@ class User(Base):
     record_links = relationship("RecordLink", back_populates="owner")
     table_permissions = relationship("TablePermission", back_populates="user") # User.table_permissions
 
-class Base(Base):
+class Base(DeclarativeBase):
     __tablename__ = "bases"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -29,7 +29,7 @@ class Base(Base):
     owner = relationship("User", back_populates="bases")
     tables = relationship("Table", back_populates="base", cascade="all, delete-orphan")
 
-class Table(Base):
+class Table(DeclarativeBase):
     __tablename__ = "tables"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -44,7 +44,7 @@ class Table(Base):
     views = relationship("View", back_populates="table", cascade="all, delete-orphan")
     user_permissions = relationship("TablePermission", back_populates="table", cascade="all, delete-orphan") # Table.user_permissions
 
-class Field(Base):
+class Field(DeclarativeBase):
     __tablename__ = "fields"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -59,7 +59,7 @@ class Field(Base):
     record_values = relationship("RecordValue", back_populates="field", cascade="all, delete-orphan")
     record_links = relationship("RecordLink", foreign_keys="RecordLink.source_field_id", back_populates="source_field", cascade="all, delete-orphan")
 
-class Record(Base):
+class Record(DeclarativeBase):
     __tablename__ = "records"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -74,7 +74,9 @@ class Record(Base):
     initiated_links = relationship("RecordLink", foreign_keys="RecordLink.source_record_id", back_populates="source_record", cascade="all, delete-orphan")
     linked_to_this_record = relationship("RecordLink", foreign_keys="RecordLink.linked_record_id", back_populates="linked_record", cascade="all, delete-orphan")
 
-class RecordValue(Base):
+    __mapper_args__ = {"eager_defaults": True} # created_at/updated_at come back with the INSERT/UPDATE, no refresh query
+
+class RecordValue(DeclarativeBase):
     __tablename__ = "record_values"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -86,7 +88,7 @@ class RecordValue(Base):
     value_number = Column(Float, nullable=True)
     value_boolean = Column(Boolean, nullable=True)
     value_datetime = Column(DateTime(timezone=True), nullable=True)
-    value_json = Column(JSON, nullable=True)
+    value_json = Column(JSON(none_as_null=True), nullable=True) # None is stored as SQL NULL, not JSON null
 
     record = relationship("Record", back_populates="values")
     field = relationship("Field", back_populates="record_values")
@@ -94,9 +96,14 @@ class RecordValue(Base):
 
     __table_args__ = (
         UniqueConstraint('record_id', 'field_id', name='uq_record_value_record_field'), # Added unique constraint
+        # Typed-value indexes used by sorting/filtering records on a field
+        Index('ix_record_values_field_value_number', 'field_id', 'value_number', 'record_id'),
+        Index('ix_record_values_field_value_text', 'field_id', 'value_text', 'record_id'),
+        Index('ix_record_values_field_value_datetime', 'field_id', 'value_datetime', 'record_id'),
+        Index('ix_record_values_field_value_boolean', 'field_id', 'value_boolean', 'record_id'),
     )
 
-class View(Base):
+class View(DeclarativeBase):
     __tablename__ = "views"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -109,7 +116,7 @@ class View(Base):
     owner = relationship("User", back_populates="views")
     table = relationship("Table", back_populates="views")
 
-class RecordLink(Base):
+class RecordLink(DeclarativeBase):
     __tablename__ = "record_links"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -118,16 +125,16 @@ class RecordLink(Base):
     linked_record_id = Column(Integer, ForeignKey("records.id"), nullable=False, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
 
-    source_record = relationship("Record", foreign_keys=[RecordLink.source_record_id], back_populates="initiated_links")
-    linked_record = relationship("Record", foreign_keys=[RecordLink.linked_record_id], back_populates="linked_to_this_record")
-    source_field = relationship("Field", foreign_keys=[RecordLink.source_field_id], back_populates="record_links")
+    source_record = relationship("Record", foreign_keys="RecordLink.source_record_id", back_populates="initiated_links")
+    linked_record = relationship("Record", foreign_keys="RecordLink.linked_record_id", back_populates="linked_to_this_record")
+    source_field = relationship("Field", foreign_keys="RecordLink.source_field_id", back_populates="record_links")
     owner = relationship("User", back_populates="record_links")
 
     __table_args__ = (
         UniqueConstraint('source_record_id', 'source_field_id', 'linked_record_id', name='uq_record_link_constraint'),
     )
 
-class TablePermission(Base):
+class TablePermission(DeclarativeBase):
     __tablename__ = "table_permissions"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -141,3 +148,24 @@ class TablePermission(Base):
     __table_args__ = (
         UniqueConstraint('user_id', 'table_id', name='uq_user_table_permission'),
     )
+
+class Job(DeclarativeBase):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    type = Column(String, nullable=False) # csv_import, csv_export, formula_backfill, records_delete
+    status = Column(String, nullable=False, default='queued', index=True) # queued, running, succeeded, failed
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    table_id = Column(Integer, nullable=True, index=True) # No foreign key: a job's row outlives a deleted table
+    params = Column(JSON, nullable=False)
+    state = Column(JSON, nullable=True) # Checkpoint saved with each committed chunk, used to resume
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    owner = relationship("User")
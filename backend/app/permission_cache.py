@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import READ_PRIMARY
+from .permission_levels import PermissionLevel
+
+# Table permission resolution for crud.get_user_table_permission_level, cached at two levels:
+# - per request: a memo in the request's Session.info, so repeated checks within a request cost nothing;
+# - per process: (user_id, table_id) -> level for settings.PERMISSION_CACHE_TTL_SECONDS.
+# crud evicts a table's entries when its permissions change (grant/revoke) or it is deleted. Each eviction bumps
+# the table's generation, so a level read while a change was committing is not stored. Other processes only see
+# a change once their entry expires. "No access" (None) is cached too.
+
+_MEMO_KEY = "table_permissions"
+_lock = threading.Lock()
+_entries: Dict[tuple, tuple] = {} # (user_id, table_id) -> (level, expires at)
+_generations: Dict[int, int] = {}
+_stats = {"hits": 0, "request_hits": 0, "misses": 0, "evictions": 0}
+
+
+def _load_permission_levels(db: Session, table_ids: Iterable[int], user_id: int) -> Dict[int, Optional[PermissionLevel]]:
+    # One query: the base owner is an admin of every table of the base, anyone else needs a TablePermission row
+    query = (select(models.Table.id, models.Base.owner_id, models.TablePermission.permission_level)
+             .join(models.Base, models.Base.id == models.Table.base_id)
+             .outerjoin(models.TablePermission, and_(models.TablePermission.table_id == models.Table.id, models.TablePermission.user_id == user_id))
+             .where(models.Table.id.in_(list(table_ids))).execution_options(**READ_PRIMARY))
+    levels = {}
+    for table_id, base_owner_id, permission_level in db.execute(query):
+        if base_owner_id == user_id: levels[table_id] = PermissionLevel.ADMIN
+        else: levels[table_id] = PermissionLevel(permission_level) if permission_level else None
+    return levels
+
+
+def resolve_table_permissions(db: Session, table_ids: Iterable[int], user_id: int) -> Dict[int, Optional[PermissionLevel]]:
+    """
+    The user's permission level for each table id (None: no access, or no such table); tables that are not
+    memoized for this request or cached for this process are resolved with one query, e.g. for listing pages.
+    """
+    memo = db.info.setdefault(_MEMO_KEY, {})
+    levels, pending = {}, []
+    now = time.monotonic()
+    with _lock:
+        for table_id in dict.fromkeys(table_ids):
+            key = (user_id, table_id)
+            if key in memo:
+                levels[table_id] = memo[key]; _stats["request_hits"] += 1
+                continue
+            entry = _entries.get(key)
+            if entry is not None and entry[1] > now:
+                levels[table_id] = memo[key] = entry[0]; _stats["hits"] += 1
+                continue
+            pending.append(table_id); _stats["misses"] += 1
+        generations = {table_id: _generations.get(table_id, 0) for table_id in pending}
+    if pending:
+        loaded = _load_permission_levels(db, pending, user_id)
+        expires_at = time.monotonic() + settings.PERMISSION_CACHE_TTL_SECONDS
+        with _lock:
+            if len(_entries) + len(pending) > settings.PERMISSION_CACHE_MAX_ENTRIES: _drop_expired_entries()
+            for table_id in pending:
+                level = levels[table_id] = memo[(user_id, table_id)] = loaded.get(table_id)
+                if _generations.get(table_id, 0) == generations[table_id]: _entries[(user_id, table_id)] = (level, expires_at)
+    return levels
+
+
+def resolve_table_permission(db: Session, table_id: int, user_id: int) -> Optional[PermissionLevel]:
+    return resolve_table_permissions(db, [table_id], user_id)[table_id]
+
+
+def _drop_expired_entries():
+    # Called with _lock held; when everything is still fresh, the oldest entries go first
+    now = time.monotonic()
+    for key in [key for key, (_, expires_at) in _entries.items() if expires_at <= now]: del _entries[key]
+    while len(_entries) >= settings.PERMISSION_CACHE_MAX_ENTRIES: del _entries[next(iter(_entries))]
+
+
+def evict_table_permissions(table_ids: Iterable[int], db: Optional[Session] = None) -> None:
+    # Drops every user's cached level for the tables, in this process and in db's request memo
+    table_ids = set(table_ids)
+    with _lock:
+        for table_id in table_ids: _generations[table_id] = _generations.get(table_id, 0) + 1
+        for key in [key for key in _entries if key[1] in table_ids]: del _entries[key]
+        _stats["evictions"] += len(table_ids)
+    if db is not None:
+        memo = db.info.get(_MEMO_KEY, {})
+        for key in [key for key in memo if key[1] in table_ids]: del memo[key]
+
+
+def clear_permission_cache() -> None:
+    with _lock:
+        for _, table_id in _entries: _generations[table_id] = _generations.get(table_id, 0) + 1
+        _entries.clear()
+
+
+def permission_cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
@@ -4,3 +4,10 @@ class PermissionLevel(str, Enum):
     VIEWER = "viewer"
     EDITOR = "editor"
     ADMIN = "admin"
+
+# PermissionLevel is a str Enum, so < and > compare the values alphabetically ("admin" < "editor" < "viewer"): compare ranks
+PERMISSION_RANKS = {PermissionLevel.VIEWER: 0, PermissionLevel.EDITOR: 1, PermissionLevel.ADMIN: 2}
+
+def has_permission(level, required_level: PermissionLevel) -> bool:
+    # level: the user's level on the table, or None without access
+    return level is not None and PERMISSION_RANKS[PermissionLevel(level)] >= PERMISSION_RANKS[required_level]
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import READ_PRIMARY, run_db
+
+# Process-local cache of authenticated users for auth.get_current_user: token subject (the email) -> Principal,
+# so a request with a valid JWT does not look its user up again. LRU bounded by PRINCIPAL_CACHE_MAX_ENTRIES,
+# entries expire after PRINCIPAL_CACHE_TTL_SECONDS. crud evicts a user's entry when the users row is written;
+# each eviction bumps the generation, so a user loaded while a write was committing is not stored. Other
+# processes only see a change once their entry expires. Unknown subjects are not cached.
+
+
+class Principal:
+    # What the endpoints use of the current user; unlike a models.User it holds no session
+    __slots__ = ("id", "email")
+
+    def __init__(self, id: int, email: str):
+        self.id = id
+        self.email = email
+
+    def __repr__(self):
+        return f"Principal(id={self.id!r}, email={self.email!r})"
+
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple]" = OrderedDict() # subject -> (Principal, expires at), least recently used first
+_generation = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+
+def _load_principal(db: Session, subject: str) -> Optional[Principal]:
+    row = db.query(models.User.id, models.User.email).filter(models.User.email == subject).execution_options(**READ_PRIMARY).first() # Not the ORM object
+    return Principal(row.id, row.email) if row is not None else None
+
+
+async def get_principal(db, subject: str) -> Optional[Principal]:
+    # The user the token subject names, or None when there is no such user; hits do not touch db (Session or AsyncSession)
+    with _lock:
+        entry = _entries.get(subject)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                _entries.move_to_end(subject); _stats["hits"] += 1
+                return entry[0]
+            del _entries[subject]; _stats["expired"] += 1
+        _stats["misses"] += 1
+        generation = _generation
+    principal = await run_db(db, _load_principal, subject)
+    if principal is not None:
+        with _lock:
+            if _generation == generation: # No user evicted while loading
+                _entries[subject] = (principal, time.monotonic() + settings.PRINCIPAL_CACHE_TTL_SECONDS)
+                _entries.move_to_end(subject)
+                while len(_entries) > settings.PRINCIPAL_CACHE_MAX_ENTRIES: _entries.popitem(last=False)
+    return principal
+
+
+def evict_principal(user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+    # Drops the cached principal of a user, by id and/or email (the token subject)
+    global _generation
+    with _lock:
+        _generation += 1
+        for subject in [subject for subject, (principal, _) in _entries.items() if subject == email or principal.id == user_id]:
+            del _entries[subject]; _stats["evictions"] += 1
+
+
+def clear_principal_cache() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+
+
+def principal_cache_stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {**_stats, "entries": len(_entries), "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None}
@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import math
+import threading
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import Dict, Optional
+
+from .config import settings
+
+# Read-your-writes for the replica routing of database.RoutingSession. Replicas lag behind the primary, so after
+# a user's own write their reads stay on the primary for REPLICA_READ_YOUR_WRITES_SECONDS. The write is
+# remembered two ways: per user id in this process, and as a token (the time until which to read from the
+# primary) in a cookie, which the next request carries to whichever process serves it. The token is signed with
+# SECRET_KEY and clamped to one window, so a client cannot pin its reads to the primary.
+
+READ_PRIMARY_UNTIL_COOKIE = "read_primary_until"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RequestRouting:
+    # Routing state of the current request, shared by every session the request opens (also in threadpool copies of its context)
+    __slots__ = ("read_only", "user_id", "read_primary_until", "wrote")
+
+    def __init__(self, read_only: bool, read_primary_until: float = 0.0):
+        self.read_only = read_only
+        self.user_id: Optional[int] = None
+        self.read_primary_until = read_primary_until
+        self.wrote = False
+
+
+_request_routing: ContextVar[Optional[RequestRouting]] = ContextVar("request_routing", default=None)
+_lock = threading.Lock()
+_last_writes: Dict[int, float] = {} # user id -> time.time() of their last committed write
+
+
+def current_routing() -> Optional[RequestRouting]:
+    return _request_routing.get()
+
+
+def set_request_user(user_id: int) -> None:
+    # Called once the request is authenticated (auth.get_current_user)
+    routing = _request_routing.get()
+    if routing is not None: routing.user_id = user_id
+
+
+def record_write(user_id: Optional[int]) -> None:
+    now = time.time()
+    routing = _request_routing.get()
+    if routing is not None:
+        routing.wrote = True
+        user_id = user_id if user_id is not None else routing.user_id
+    if user_id is None: return
+    with _lock:
+        if len(_last_writes) > 100000: # Drop users whose window is over
+            for key in [key for key, written_at in _last_writes.items() if now - written_at > settings.REPLICA_READ_YOUR_WRITES_SECONDS]: del _last_writes[key]
+        _last_writes[user_id] = now
+
+
+def must_read_primary(user_id: Optional[int]) -> bool:
+    # True while the user (or the client, through its cookie) is within the read-your-writes window of a write
+    now = time.time()
+    routing = _request_routing.get()
+    if routing is not None:
+        if routing.read_primary_until > now: return True
+        user_id = user_id if user_id is not None else routing.user_id
+    if user_id is None: return False
+    with _lock:
+        written_at = _last_writes.get(user_id)
+    return written_at is not None and now - written_at < settings.REPLICA_READ_YOUR_WRITES_SECONDS
+
+
+def _token_signature(read_primary_until: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"{READ_PRIMARY_UNTIL_COOKIE}:{read_primary_until}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def make_read_primary_token(read_primary_until: float) -> str:
+    value = f"{read_primary_until:.3f}"
+    return f"{value}.{_token_signature(value)}"
+
+
+def read_primary_until_from_token(token: str) -> float:
+    # 0 for a token this app did not sign; never more than one window from now
+    value, _, signature = token.rpartition(".")
+    if not value or not hmac.compare_digest(signature, _token_signature(value)): return 0.0
+    try:
+        read_primary_until = float(value)
+    except ValueError:
+        return 0.0
+    return min(read_primary_until, time.time() + settings.REPLICA_READ_YOUR_WRITES_SECONDS) if math.isfinite(read_primary_until) else 0.0
+
+
+def _read_primary_until_from_cookies(headers) -> float:
+    for name, value in headers:
+        if name != b"cookie": continue
+        morsel = SimpleCookie(value.decode("latin-1")).get(READ_PRIMARY_UNTIL_COOKIE)
+        if morsel is not None: return read_primary_until_from_token(morsel.value)
+    return 0.0
+
+
+class ReadReplicaMiddleware:
+    """
+    ASGI middleware: marks GET/HEAD/OPTIONS requests read-only (their sessions read from a replica) and sets the
+    read_primary_until cookie on responses to requests that wrote. Only installed when replicas are configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        routing = RequestRouting(scope["method"] in READ_METHODS, _read_primary_until_from_cookies(scope["headers"]))
+        token = _request_routing.set(routing)
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and routing.wrote:
+                window = settings.REPLICA_READ_YOUR_WRITES_SECONDS
+                cookie = f"{READ_PRIMARY_UNTIL_COOKIE}={make_read_primary_token(time.time() + window)}; Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _request_routing.reset(token)
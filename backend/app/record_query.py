@@ -0,0 +1,170 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, asc, cast, desc, false, func, literal, not_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+# Building blocks for record listing queries: which record_values column holds a field type,
+# how view filter operators translate to SQL, and keyset (cursor) pagination over sort keys.
+# Kept free of the ORM models so the SQL semantics can be tested on their own.
+
+JSON_FIELD_TYPES = ('multiSelect', 'linkToRecord', 'attachment')
+
+FILTER_OPERATORS = ('eq', 'neq', 'contains', 'not_contains', 'gt', 'gte', 'lt', 'lte', 'between', 'is_empty', 'is_not_empty')
+COLUMN_FILTER_OPERATORS = {
+    'value_number': {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'between', 'is_empty', 'is_not_empty'},
+    'value_datetime': {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'between', 'is_empty', 'is_not_empty'},
+    'value_text': {'eq', 'neq', 'contains', 'not_contains', 'is_empty', 'is_not_empty'},
+    'value_boolean': {'eq', 'neq', 'is_empty', 'is_not_empty'},
+    'value_json': {'is_empty', 'is_not_empty'},
+}
+
+
+def typed_value_column_name(field_type: str) -> str:
+    """Column of record_values a field type is stored in (mirrors crud._map_value_to_record_value_columns)."""
+    if field_type in JSON_FIELD_TYPES: return 'value_json'
+    if field_type in ('number', 'count', 'formula'): return 'value_number' # Formula results are stored as numbers
+    if field_type in ('date', 'createdTime', 'lastModifiedTime'): return 'value_datetime'
+    if field_type == 'boolean': return 'value_boolean'
+    return 'value_text'
+
+
+def parse_number(value: Any) -> float:
+    if isinstance(value, bool): raise ValueError("expected a number")
+    try: return float(value)
+    except (ValueError, TypeError): raise ValueError("expected a number")
+
+
+def parse_boolean(value: Any) -> bool:
+    if isinstance(value, bool): return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'): return value.strip().lower() == 'true'
+    raise ValueError("expected true or false")
+
+
+def parse_datetime_range(value: Any) -> Tuple[datetime, Optional[datetime]]:
+    """
+    Parses an ISO date or datetime filter value.
+    Returns (start, end): a date-only value covers the whole day [start, end), a datetime is a point (end is None).
+    """
+    if not isinstance(value, str): raise ValueError("expected an ISO date or datetime")
+    text = value.strip()
+    try: start = datetime.fromisoformat(text)
+    except ValueError: raise ValueError("expected an ISO date or datetime")
+    if len(text) == 10: return start, start + timedelta(days=1)
+    return start, None
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+def filter_condition(field_type: str, column: ColumnElement, operator: str, value: Any) -> Optional[ColumnElement]:
+    """
+    SQL condition for one filter on a field's typed value column.
+    Empty cells (NULL) never match eq/gt/lt/contains and always match neq/not_contains.
+    Returns None for a filter whose value has not been filled in yet; raises ValueError for invalid filters.
+    """
+    column_name = typed_value_column_name(field_type)
+    if operator not in FILTER_OPERATORS: raise ValueError(f"Unknown filter operator '{operator}'")
+    if operator not in COLUMN_FILTER_OPERATORS[column_name]: raise ValueError(f"Operator '{operator}' is not supported for {field_type} fields")
+    if operator in ('is_empty', 'is_not_empty'):
+        if column_name == 'value_text': empty = or_(column.is_(None), column == '')
+        elif column_name == 'value_boolean': empty = or_(column.is_(None), column == false()) # An unchecked checkbox is empty
+        elif column_name == 'value_json': empty = or_(column.is_(None), cast(column, String).in_(('null', '[]')))
+        else: empty = column.is_(None)
+        return empty if operator == 'is_empty' else not_(empty)
+    if operator == 'between':
+        if not isinstance(value, (list, tuple)) or len(value) != 2: raise ValueError("between expects a [start, end] pair")
+        if _is_missing(value[0]) or _is_missing(value[1]): return None
+        return and_(filter_condition(field_type, column, 'gte', value[0]), filter_condition(field_type, column, 'lte', value[1]))
+    if _is_missing(value): return None
+
+    if column_name == 'value_number':
+        number = parse_number(value)
+        return _compare(column, operator, number)
+    if column_name == 'value_boolean':
+        checked = parse_boolean(value)
+        is_checked = column == True
+        is_unchecked = or_(column == False, column.is_(None))
+        return (is_checked if checked else is_unchecked) if operator == 'eq' else (is_unchecked if checked else is_checked)
+    if column_name == 'value_datetime':
+        start, end = parse_datetime_range(value)
+        if end is None: return _compare(column, operator, start)
+        whole_day = and_(column >= start, column < end)
+        if operator == 'eq': return whole_day
+        if operator == 'neq': return or_(not_(whole_day), column.is_(None))
+        if operator == 'gt': return column >= end
+        if operator == 'gte': return column >= start
+        if operator == 'lt': return column < start
+        return column < end # lte: up to the end of that day
+    # Text: case-insensitive comparisons
+    text = str(value)
+    if operator in ('eq', 'neq'):
+        equal = func.lower(column) == text.lower()
+        return equal if operator == 'eq' else or_(not_(equal), column.is_(None))
+    escaped_text = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    contains = column.ilike(f"%{escaped_text}%", escape='\\')
+    return contains if operator == 'contains' else or_(not_(contains), column.is_(None))
+
+
+def _compare(column: ColumnElement, operator: str, value: Any) -> ColumnElement:
+    if operator == 'eq': return column == value
+    if operator == 'neq': return or_(column != value, column.is_(None))
+    if operator == 'gt': return column > value
+    if operator == 'gte': return column >= value
+    if operator == 'lt': return column < value
+    return column <= value
+
+
+def sort_order_clauses(sort_keys: Sequence[Tuple[ColumnElement, str]], id_column: ColumnElement) -> list:
+    """ORDER BY for (expression, direction) sort keys: empty cells last in both directions, ties broken by record id."""
+    clauses = [(desc(expression) if direction == "desc" else asc(expression)).nulls_last() for expression, direction in sort_keys]
+    return clauses + [id_column]
+
+
+def keyset_condition(sort_keys: Sequence[Tuple[ColumnElement, str]], id_column: ColumnElement, cursor_values: Sequence[Any], cursor_id: int) -> ColumnElement:
+    """Rows strictly after the cursor position in the order of sort_order_clauses."""
+    condition = id_column > cursor_id
+    for (expression, direction), cursor_value in reversed(list(zip(sort_keys, cursor_values))):
+        if cursor_value is None: # Already in this key's trailing NULLs
+            condition = and_(expression.is_(None), condition)
+            continue
+        cursor_literal = literal(cursor_value) # Bound parameter, so boolean sort values can be range-compared too
+        past_value = expression < cursor_literal if direction == "desc" else expression > cursor_literal
+        condition = or_(past_value, expression.is_(None), and_(expression == cursor_literal, condition))
+    return condition
+
+
+def encode_cursor(sort_key_ids: Sequence[Tuple[Optional[int], str]], sort_values: Sequence[Any], record_id: int) -> str:
+    """Opaque cursor for the position after a record: its sort key values plus its id."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in sort_values]
+    payload = {"k": [list(key) for key in sort_key_ids], "v": values, "id": record_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_key_ids: Sequence[Tuple[Optional[int], str]], sort_field_types: Sequence[str]) -> Tuple[List[Any], int]:
+    """
+    Returns (sort values, record id) from a cursor issued by encode_cursor for the same sort keys.
+    Raises ValueError for malformed cursors or cursors issued for a different sort.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        key_ids, values, record_id = payload["k"], payload["v"], int(payload["id"])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("malformed cursor")
+    if not isinstance(key_ids, list) or not all(isinstance(key, list) for key in key_ids) or not isinstance(values, list):
+        raise ValueError("malformed cursor")
+    if [tuple(key) for key in key_ids] != [tuple(key) for key in sort_key_ids] or len(values) != len(sort_field_types):
+        raise ValueError("cursor was issued for a different sort")
+    decoded = []
+    for field_type, value in zip(sort_field_types, values):
+        column_name = typed_value_column_name(field_type)
+        if value is None: decoded.append(None)
+        elif column_name == 'value_number' and not isinstance(value, bool) and isinstance(value, (int, float)): decoded.append(value)
+        elif column_name == 'value_boolean' and isinstance(value, bool): decoded.append(value)
+        elif column_name == 'value_text' and isinstance(value, str): decoded.append(value)
+        elif column_name == 'value_datetime' and isinstance(value, str): decoded.append(datetime.fromisoformat(value))
+        else: raise ValueError("cursor value does not match the sort field type")
+    return decoded, record_id
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import auth, crud, schemas
-from ..database import get_db
+from ..database import get_async_db
 
 router = APIRouter(
     prefix="/auth",
@@ -11,21 +11,28 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=schemas.User)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    await db.commit() # Ends the read transaction: no connection is held while the password is hashed
+    password_hash = await auth.hash_password(user.password) # In the password hashing pool; 429 when it is saturated
+    return await db.run_sync(crud.create_user, user=user, password_hash=password_hash)
 
 @router.post("/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username) # OAuth2PasswordRequestForm uses 'username' field for email
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(crud.get_user_by_email, email=form_data.username) # OAuth2PasswordRequestForm uses 'username' field for email
+    await db.commit() # Ends the read transaction: no connection is held while the password is verified
+    # In the password hashing pool; 429 when it is saturated
+    valid, new_password_hash = await auth.verify_and_update_password(form_data.password, user.password_hash if user else None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_password_hash: # Hashed with another cost factor than BCRYPT_ROUNDS
+        await db.run_sync(crud.update_user_password_hash, user_id=user.id, password_hash=new_password_hash)
     access_token = auth.create_access_token(
         data={"sub": user.email}
     )
@@ -3,7 +3,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from .. import auth, crud, models, schemas
+from .. import auth, crud, schemas
 from ..database import get_db
 
 router = APIRouter(
@@ -16,7 +16,7 @@ router = APIRouter(
 async def create_new_base(
     base: schemas.BaseCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     return crud.create_base(db=db, base=base, owner_id=current_user.id)
 
@@ -25,7 +25,7 @@ async def read_user_bases(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     bases = crud.get_bases_by_owner(db, owner_id=current_user.id, skip=skip, limit=limit)
     return bases
@@ -34,7 +34,7 @@ async def read_user_bases(
 async def read_single_base(
     base_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     db_base = crud.get_base(db, base_id=base_id, owner_id=current_user.id)
     if db_base is None:
@@ -46,7 +46,7 @@ async def update_existing_base(
     base_id: int,
     base_update: schemas.BaseUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     updated_base = crud.update_base(db, base_id=base_id, base_update=base_update, owner_id=current_user.id)
     if updated_base is None:
@@ -57,7 +57,7 @@ async def update_existing_base(
 async def delete_existing_base(
     base_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     deleted_base = crud.delete_base(db, base_id=base_id, owner_id=current_user.id)
     if deleted_base is None: # crud.delete_base now returns the object if found, or None
@@ -1,9 +1,9 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 
-from .. import auth, crud, models, schemas
+from .. import auth, crud, schemas
 from ..database import get_db
 
 router = APIRouter(
@@ -15,11 +15,13 @@ router = APIRouter(
 async def create_field_for_table_endpoint(
     table_id: int,
     field: schemas.FieldCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.create_table_field will check if table exists and if user owns it
-    return crud.create_table_field(db=db, field=field, table_id=table_id, user_id=current_user.id)
+    # New formula fields are computed for existing records in the background
+    return crud.create_table_field(db=db, field=field, table_id=table_id, user_id=current_user.id, background_tasks=background_tasks)
 
 @router.get("/tables/{table_id}/fields", response_model=List[schemas.Field])
 async def read_fields_for_table_endpoint(
@@ -27,7 +29,7 @@ async def read_fields_for_table_endpoint(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.get_fields_by_table will check if table exists and if user owns it
     fields = crud.get_fields_by_table(db, table_id=table_id, user_id=current_user.id, skip=skip, limit=limit)
@@ -37,7 +39,7 @@ async def read_fields_for_table_endpoint(
 async def read_field_endpoint(
     field_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     db_field = crud.get_field(db, field_id=field_id, user_id=current_user.id)
     # This check is also in crud.get_field, but included for robustness / explicitness at router level
@@ -49,10 +51,12 @@ async def read_field_endpoint(
 async def update_field_endpoint(
     field_id: int,
     field_update: schemas.FieldUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    updated_field = crud.update_field(db, field_id=field_id, field_update=field_update, user_id=current_user.id)
+    # Stored values of formulas affected by the change are recomputed in the background
+    updated_field = crud.update_field(db, field_id=field_id, field_update=field_update, user_id=current_user.id, background_tasks=background_tasks)
     # This check is also in crud.update_field
     if updated_field is None:
         raise HTTPException(status_code=404, detail="Field not found or insufficient permissions")
@@ -61,10 +65,11 @@ async def update_field_endpoint(
 @router.delete("/fields/{field_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_field_endpoint(
     field_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    deleted_field = crud.delete_field(db, field_id=field_id, user_id=current_user.id)
+    deleted_field = crud.delete_field(db, field_id=field_id, user_id=current_user.id, background_tasks=background_tasks)
     # This check is also in crud.delete_field
     if deleted_field is None:
         raise HTTPException(status_code=404, detail="Field not found or insufficient permissions")
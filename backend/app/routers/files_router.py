@@ -1,11 +1,11 @@
 import os
 import uuid
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from starlette.responses import FileResponse
 
-from .. import auth, models # For current_user dependency
+from .. import auth, models, schemas # For current_user dependency
 from ..config import settings # If you have path settings, otherwise define here
 
 router = APIRouter(
@@ -76,6 +76,3 @@ async def download_file(filename: str):
     # Determine media type based on filename extension if needed, or let browser infer.
     # FileResponse attempts to guess media_type.
     return FileResponse(path=file_path, filename=filename) # filename suggests download name to browser
-
-# Need to import schemas for FileMetadataResponse
-from .. import schemas
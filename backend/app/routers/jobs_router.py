@@ -0,0 +1,43 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.responses import FileResponse
+
+from .. import auth, jobs, schemas
+from ..database import get_db
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    dependencies=[Depends(auth.get_current_active_user)],
+)
+
+# Progress is also sent as "job_progress" events to the table's WebSocket room while a job runs
+
+@router.get("/{job_id}", response_model=schemas.Job)
+async def read_job_endpoint(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    db_job = jobs.get_job(db, job_id=job_id, user_id=current_user.id) # Only the user who started a job can see it
+    if db_job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return db_job
+
+@router.get("/{job_id}/download")
+async def download_job_file_endpoint(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    db_job = jobs.get_job(db, job_id=job_id, user_id=current_user.id)
+    if db_job is None or db_job.type != 'csv_export':
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    if db_job.status != jobs.JOB_SUCCEEDED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Export is not finished (status: {db_job.status})")
+    file_path = os.path.join(jobs.JOBS_DIRECTORY, db_job.params["file_name"])
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export file not found")
+    return FileResponse(file_path, media_type="text/csv", filename=db_job.params["download_name"])
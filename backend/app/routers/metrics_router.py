@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from ..database import pool_stats
+from ..permission_cache import permission_cache_stats
+from ..principal_cache import principal_cache_stats
+from ..schema_cache import schema_cache_stats
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+# Process-local counters, for checking that the caches work (each worker process reports its own).
+# Not authenticated: main.py only includes this router when settings.METRICS_ENABLED is set.
+
+@router.get("")
+async def read_metrics_endpoint():
+    return {"schema_cache": schema_cache_stats(), "permission_cache": permission_cache_stats(), "principal_cache": principal_cache_stats(), "db_pool": pool_stats()}
@@ -1,9 +1,9 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import auth, crud, models, schemas
-from ..database import get_db
+from .. import auth, crud, schemas
+from ..database import get_async_db
 from ..permission_levels import PermissionLevel
 
 router = APIRouter(
@@ -30,15 +30,15 @@ class GrantPermissionRequest(schemas.BaseModel):
 async def grant_permission_for_table(
     table_id: int,
     request: GrantPermissionRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    target_user = crud.get_user_by_email(db, email=request.user_email)
+    target_user = await db.run_sync(crud.get_user_by_email, email=request.user_email)
     if not target_user:
         raise HTTPException(status_code=404, detail=f"User with email {request.user_email} not found")
 
-    permission_sa = crud.grant_table_permission(
-        db=db,
+    permission_sa = await db.run_sync(
+        crud.grant_table_permission,
         table_id=table_id,
         target_user_id=target_user.id,
         permission_level=request.permission_level,
@@ -55,11 +55,11 @@ async def grant_permission_for_table(
 async def revoke_permission_for_table(
     table_id: int,
     target_user_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    crud.revoke_table_permission(
-        db=db,
+    await db.run_sync(
+        crud.revoke_table_permission,
         table_id=table_id,
         target_user_id=target_user_id,
         current_user_id=current_user.id
@@ -71,17 +71,17 @@ async def revoke_permission_for_table(
 @router.get("/", response_model=List[TablePermissionResponse])
 async def list_permissions_for_table(
     table_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    permissions_sa_list = crud.get_table_permissions(db=db, table_id=table_id, current_user_id=current_user.id)
+    permissions_sa_list = await db.run_sync(crud.get_table_permissions, table_id=table_id, current_user_id=current_user.id) # With their users
 
     response_list = []
     for perm_sa in permissions_sa_list:
         # perm_sa.user should be loaded if relationship is set up correctly, or fetch user
         user_email = perm_sa.user.email if perm_sa.user else "Unknown" # Fallback, ideally user always exists
         if not perm_sa.user: # If user somehow not loaded/deleted, fetch manually
-            user_model = crud.get_user(db, user_id=perm_sa.user_id)
+            user_model = await db.run_sync(crud.get_user, user_id=perm_sa.user_id)
             if user_model: user_email = user_model.email
 
         response_list.append(TablePermissionResponse(
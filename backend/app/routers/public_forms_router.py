@@ -1,9 +1,11 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from .. import crud, models, schemas
 from ..database import get_db # For DB session
+from ..schema_cache import get_table_schema
 # Assuming ConnectionManager is not directly needed here unless forms trigger real-time events to other systems
 # from ..websocket_manager import get_connection_manager
 
@@ -46,18 +48,8 @@ async def get_public_form_config(view_id: int, db: Session = Depends(get_db)):
 
     response_form_fields: List[PublicFormFieldDetail] = []
 
-    # Get all field IDs from the form config to fetch their definitions in one query
-    configured_field_ids = [ff_conf.field_id for ff_conf in form_config.form_fields or []]
-    if not configured_field_ids:
-         # No fields configured for the form, or form_fields is empty
-        pass # Return empty list of fields if none are configured
-
-    db_fields = db.query(models.Field).filter(
-        models.Field.id.in_(configured_field_ids),
-        models.Field.table_id == db_view.table_id # Ensure fields belong to the view's table
-    ).all()
-
-    db_fields_map = {field.id: field for field in db_fields}
+    # Field definitions of the view's table, from the schema cache (configured fields of other tables are not found)
+    db_fields_map = get_table_schema(db, db_view.table_id).fields_by_id
 
     for ff_config in sorted(form_config.form_fields or [], key=lambda f: f.order):
         field_model = db_fields_map.get(ff_config.field_id)
@@ -106,11 +98,7 @@ async def submit_public_form(
     # Validate submission against form_fields config (is_required, types later if needed)
     record_values_payload: Dict[int, Any] = {} # To build {field_id: value} for crud.create_table_record
 
-    configured_field_ids = {ff_conf.field_id: ff_conf for ff_conf in form_config.form_fields or []}
-    db_fields_map = {
-        field.id: field for field in
-        db.query(models.Field).filter(models.Field.id.in_(configured_field_ids.keys())).all()
-    }
+    db_fields_map = get_table_schema(db, db_view.table_id).fields_by_id # Only fields of the view's table
 
     for ff_conf in form_config.form_fields or []:
         field_id = ff_conf.field_id
@@ -1,10 +1,14 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .. import auth, crud, models, schemas
-from ..database import get_db
+from .. import auth, crud, fast_json, jobs, schemas
+from ..config import settings
+from ..database import get_async_db, get_db
 
 router = APIRouter(
     tags=["records"],
@@ -15,14 +19,84 @@ router = APIRouter(
 async def create_record_in_table_endpoint(
     table_id: int,
     record_data: schemas.RecordCreate, # Uses {field_id: value} dict
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.create_table_record handles table ownership check and record creation
-    return crud.create_table_record(db=db, record_data=record_data, table_id=table_id, user_id=current_user.id)
+    return await crud.create_table_record(db=db, record_data=record_data, table_id=table_id, user_id=current_user.id)
+
+# Batch endpoints: items that fail validation are reported in results (by index) and the rest are still written
+@router.post("/tables/{table_id}/records:batch", response_model=schemas.RecordBatchResult)
+async def create_records_batch_endpoint(
+    table_id: int,
+    batch: schemas.RecordBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    return await crud.create_records_batch(db, table_id=table_id, items=batch.records, user_id=current_user.id)
+
+@router.patch("/tables/{table_id}/records:batch", response_model=schemas.RecordBatchResult)
+async def update_records_batch_endpoint(
+    table_id: int,
+    batch: schemas.RecordBatchUpdate, # Only the fields present in each item's values are changed
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    return await crud.update_records_batch(db, table_id=table_id, items=batch.records, user_id=current_user.id)
+
+@router.delete("/tables/{table_id}/records:batch", response_model=schemas.RecordBatchResult, responses={202: {"model": schemas.Job}})
+async def delete_records_batch_endpoint(
+    table_id: int,
+    batch: schemas.RecordBatchDelete,
+    background_tasks: BackgroundTasks,
+    background: bool = False, # Delete any number of records as a job, in chunks; returns the job (202)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    if background:
+        db_job = await db.run_sync(crud.enqueue_records_delete, table_id=table_id, record_ids=batch.record_ids, user_id=current_user.id)
+        background_tasks.add_task(jobs.submit_job, db_job.id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(schemas.Job.model_validate(db_job)))
+    return await crud.delete_records_batch(db, table_id=table_id, record_ids=batch.record_ids, user_id=current_user.id)
 
 from typing import Optional # Import Optional
 
+# NDJSON (application/x-ndjson): one JSON record per line, for consumers processing records as they arrive
+async def ndjson_lines(request: Request):
+    # Splits the request body into lines as it is received
+    pending = b""
+    async for data in request.stream():
+        *lines, pending = (pending + data).split(b"\n")
+        for line in lines: yield line
+    if pending: yield pending
+
+@router.get("/tables/{table_id}/records:stream")
+async def stream_records_for_table_endpoint(
+    table_id: int,
+    after_id: int = 0, # Only records with a greater id, e.g. to resume an interrupted read
+    fields: Optional[str] = None, # Comma-separated field ids to return values for; all fields when omitted
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    # Every record of the table in id order, in the same JSON shape as GET /tables/{table_id}/records, read from the database chunk by chunk
+    record_chunks = await db.run_sync(crud.stream_table_records, table_id=table_id, user_id=current_user.id, field_ids=crud.parse_field_ids(fields), after_record_id=after_id, chunk_size=settings.RECORDS_STREAM_CHUNK_SIZE)
+    def lines():
+        for records in record_chunks:
+            yield b"".join(fast_json.dumps(record) + b"\n" for record in records)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/tables/{table_id}/records:ingest")
+async def ingest_records_for_table_endpoint(
+    table_id: int,
+    request: Request, # NDJSON body: one {"values": {field_id: value}} per line
+    db: Session = Depends(get_db), # Chunks are inserted in a worker thread (crud.ingest_table_records), so a sync session
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    # Records are inserted in chunks while the body is still being received; the response is the same as the CSV import's
+    errors = []
+    success_count = await crud.ingest_table_records(db, table_id=table_id, user_id=current_user.id, lines=ndjson_lines(request), errors=errors, chunk_size=settings.RECORDS_STREAM_CHUNK_SIZE)
+    return crud.import_summary(success_count, errors, file_kind="NDJSON")
+
 @router.get("/tables/{table_id}/records", response_model=List[schemas.Record])
 async def read_records_for_table_endpoint(
     table_id: int,
@@ -32,15 +106,18 @@ async def read_records_for_table_endpoint(
     sort_direction: Optional[str] = "asc", # Validate "asc" or "desc"
     filter_by_field_id: Optional[int] = None,
     filter_value: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    cursor: Optional[str] = None, # next_cursor of the previous page (X-Next-Cursor header)
+    fields: Optional[str] = None, # Comma-separated field ids to return values for; all fields when omitted
+    format: str = "records", # "columnar": {"table_id", "fields", "record_ids", "columns"}, one typed array per field instead of a list of records
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     if sort_direction not in ["asc", "desc"]:
         raise HTTPException(status_code=400, detail="Invalid sort_direction. Must be 'asc' or 'desc'.")
 
-    # crud.get_records_by_table handles table ownership check and other logic
-    records = crud.get_records_by_table(
-        db,
+    # crud.get_records_page handles table ownership check and other logic
+    page = await db.run_sync(
+        crud.get_records_page,
         table_id=table_id,
         user_id=current_user.id,
         skip=skip,
@@ -48,38 +125,49 @@ async def read_records_for_table_endpoint(
         sort_by_field_id=sort_by_field_id,
         sort_direction=sort_direction,
         filter_by_field_id=filter_by_field_id,
-        filter_value=filter_value
+        filter_value=filter_value,
+        cursor=cursor,
+        field_ids=crud.parse_field_ids(fields),
+        format=format
     )
-    return records
+    response = fast_json.FastJSONResponse(page.columnar if format == "columnar" else page.records) # Records already shaped as List[schemas.Record]; not validated again
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.formula_query_path:
+        # "sql" when a formula sort/filter ran in the database, "memory" when it had to load the whole table
+        response.headers["X-Formula-Query-Path"] = page.formula_query_path
+    return response
 
 @router.get("/records/{record_id}", response_model=schemas.Record)
 async def read_record_endpoint(
     record_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    fields: Optional[str] = None, # Comma-separated field ids to return values for; all fields when omitted
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    db_record = crud.get_record(db, record_id=record_id, user_id=current_user.id)
+    db_record = await db.run_sync(crud.get_record, record_id=record_id, user_id=current_user.id, field_ids=crud.parse_field_ids(fields))
     # crud.get_record raises HTTPException if not found or no access
-    return db_record
+    return fast_json.FastJSONResponse(db_record)
 
 @router.put("/records/{record_id}", response_model=schemas.Record)
+@router.patch("/records/{record_id}", response_model=schemas.Record)
 async def update_record_endpoint(
     record_id: int,
-    record_data: schemas.RecordUpdate, # Uses {field_id: value} dict
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    record_data: schemas.RecordUpdate, # Uses {field_id: value} dict; fields not in values are left unchanged
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    updated_record = crud.update_record(db, record_id=record_id, record_data=record_data, user_id=current_user.id)
+    updated_record = await crud.update_record(db, record_id=record_id, record_data=record_data, user_id=current_user.id)
     # crud.update_record raises HTTPException if not found or no access
     return updated_record
 
 @router.delete("/records/{record_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_record_endpoint(
     record_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
-    deleted_record = crud.delete_record(db, record_id=record_id, user_id=current_user.id)
+    deleted_record = await crud.delete_record(db, record_id=record_id, user_id=current_user.id)
     # crud.delete_record raises HTTPException if not found or no access
     # If it returns the object, we just ensure it's not None (though exception should cover)
     if deleted_record is None:
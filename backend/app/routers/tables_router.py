@@ -1,6 +1,6 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status, Response
 from sqlalchemy.orm import Session
 
 from .. import auth, crud, models, schemas
@@ -17,7 +17,7 @@ async def create_table_for_base_endpoint(
     base_id: int,
     table: schemas.TableCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.create_base_table will check if base exists and if user owns it
     return crud.create_base_table(db=db, table=table, base_id=base_id, user_id=current_user.id)
@@ -28,7 +28,7 @@ async def read_tables_for_base_endpoint(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.get_tables_by_base will check if base exists and if user owns it
     tables = crud.get_tables_by_base(db, base_id=base_id, user_id=current_user.id, skip=skip, limit=limit)
@@ -38,7 +38,7 @@ async def read_tables_for_base_endpoint(
 async def read_table_endpoint(
     table_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     db_table = crud.get_table(db, table_id=table_id, user_id=current_user.id)
     if db_table is None: # This check is also in crud.get_table, but good for clarity
@@ -50,7 +50,7 @@ async def update_table_endpoint(
     table_id: int,
     table_update: schemas.TableUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     updated_table = crud.update_table(db, table_id=table_id, table_update=table_update, user_id=current_user.id)
     if updated_table is None: # This check is also in crud.update_table
@@ -61,7 +61,7 @@ async def update_table_endpoint(
 async def delete_table_endpoint(
     table_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     deleted_table = crud.delete_table(db, table_id=table_id, user_id=current_user.id)
     if deleted_table is None: # crud.delete_table returns the object or raises if not found
@@ -69,14 +69,29 @@ async def delete_table_endpoint(
         raise HTTPException(status_code=404, detail="Table not found or insufficient permissions")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+import codecs
 import csv
 import io
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Dict
+from fastapi import BackgroundTasks
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import StreamingResponse
 from typing import Optional # For Optional type hint in format_value_for_csv if RecordValue can be None
-from ..permission_levels import PermissionLevel
+import pyarrow as pa
+from .. import columnar, jobs
+from ..config import settings
+from ..database import SessionLocal
+from ..permission_levels import PermissionLevel, has_permission
+from ..schema_cache import CachedField, get_table_schema
 
 
 def format_value_for_csv(value_obj: Optional[schemas.RecordValue], field_type: str) -> str:
+    # value_obj: anything with the record_values columns as attributes (schemas.RecordValue, a RecordValue or a result row)
     if not value_obj:
         return ""
 
@@ -100,161 +115,270 @@ def format_value_for_csv(value_obj: Optional[schemas.RecordValue], field_type: s
     return ""
 
 
-@router.get("/{table_id}/export_csv")
-async def export_table_to_csv(
-    table_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
-):
+def detect_csv_encoding(upload) -> str:
+    # UTF-8 (with or without BOM) if the whole upload decodes as UTF-8, else Latin-1; checked block by block, then rewound
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for block in iter(lambda: upload.read(1 << 20), b''): decoder.decode(block)
+        decoder.decode(b'', final=True)
+        return 'utf-8-sig' # Handle UTF-8 with BOM
+    except UnicodeDecodeError:
+        return 'latin-1' # Fallback to latin-1 if utf-8 fails
+    finally:
+        upload.seek(0)
+
+
+def csv_value_converter(field_type: str) -> Callable[[str], Any]:
+    # Converts a non-empty CSV cell for a field type; raises ValueError with the message reported for the row
+    # crud._map_value_to_record_value_columns expects correctly typed values for some types (like list for multiSelect)
+    if field_type == 'number' or field_type == 'count':
+        def convert_number(cell_value_str):
+            try: return float(cell_value_str)
+            except ValueError: raise ValueError("Invalid number format")
+        return convert_number
+    if field_type == 'boolean':
+        return lambda cell_value_str: cell_value_str.lower() in ['true', '1', 'yes', 't']
+    if field_type == 'multiSelect': # Comma-separated string to list of strings
+        return lambda cell_value_str: [item.strip() for item in cell_value_str.split(',') if item.strip()]
+    if field_type == 'linkToRecord': # Comma-separated string to list of record ids
+        def convert_links(cell_value_str):
+            try: return [int(item.strip()) for item in cell_value_str.split(',') if item.strip()]
+            except ValueError: raise ValueError("Invalid list of IDs for linkToRecord")
+        return convert_links
+    if field_type == 'attachment': # Import won't create attachments from filenames
+        return lambda cell_value_str: None
+    # Text-like fields, and dates as ISO strings
+    return lambda cell_value_str: cell_value_str
+
+
+def csv_record_row(record_id: int, values_map: dict, export_fields: list) -> list:
+    # export_fields: (field id, name, type) in column order
+    return [str(record_id)] + [format_value_for_csv(values_map.get(field_id), field_type) for field_id, _, field_type in export_fields]
+
+
+def iter_csv_rows(upload, field_map: Dict[str, CachedField], errors: list, start_after_row: int = 1):
+    """
+    Parses a binary CSV upload a line at a time into (row number, {field_id: value}) for crud.import_records.
+    Rows that cannot be converted are appended to errors instead. Rows up to start_after_row are skipped (resuming a job).
+    """
+    csv_data = io.TextIOWrapper(upload, encoding=detect_csv_encoding(upload), newline='')
+    try:
+        reader = csv.reader(csv_data)
+        header = next(reader, [])
+        # One converter per known column, chosen once from the field type; unknown and formula columns are skipped
+        columns = [(index, header_name, field_map[header_name].id, csv_value_converter(field_map[header_name].type)) for index, header_name in enumerate(header) if header_name in field_map]
+        for row_idx, row in enumerate(row for row in reader if row): # Blank lines are skipped, as csv.DictReader did
+            if row_idx + 2 <= start_after_row: continue
+            if not columns: # Skip empty rows or rows with no matching headers
+                errors.append({"row": row_idx + 2, "error": "No data found for any known fields in this row."})
+                continue
+            record_values_payload: Dict[int, Any] = {}
+            try:
+                for index, header_name, field_id, convert in columns:
+                    cell_value_str = row[index] if index < len(row) else None
+                    record_values_payload[field_id] = None if cell_value_str is None or cell_value_str == "" else convert(cell_value_str) # Empty cells are None
+            except ValueError as ve:
+                errors.append({"row": row_idx + 2, "field": header_name, "error": str(ve)})
+                continue
+            yield row_idx + 2, record_values_payload
+    finally:
+        csv_data.detach() # Leave the upload open for its owner to close
+
+
+def get_export_table_fields(db: Session, table_id: int, user_id: int, fields: Optional[str]):
+    # The table and its (field id, name, type) columns to export, in field id order; fields limits them to comma-separated ids
     # Verify user has at least viewer permission for the table
-    permission = crud.get_user_table_permission_level(db, table_id=table_id, user_id=current_user.id)
-    if not permission or permission < PermissionLevel.VIEWER:
+    permission = crud.get_user_table_permission_level(db, table_id=table_id, user_id=user_id)
+    if not has_permission(permission, PermissionLevel.VIEWER):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to export this table")
 
     table = db.query(models.Table).filter(models.Table.id == table_id).first() # No ownership check needed here, covered by permission
     if not table:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
 
-    fields = db.query(models.Field).filter(models.Field.table_id == table_id).order_by(models.Field.id).all()
-    # get_records_by_table returns Pydantic models with computed formulas
-    # Fetch all records for export, consider pagination/streaming for very large tables in future
-    records_data = crud.get_records_by_table(db, table_id=table_id, user_id=current_user.id, limit=1000000)
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header row: Record ID + Field Names
-    header = ["record_id"] + [field.name for field in fields]
-    writer.writerow(header)
-
-    # Data rows
-    for record_dto in records_data: # record_dto is schemas.Record
-        row = [str(record_dto.id)]
-        values_map = {val.field_id: val for val in record_dto.values} # Map field_id to Pydantic RecordValue
-        for field in fields:
-            value_obj = values_map.get(field.id) # This is a schemas.RecordValue instance
-            row.append(format_value_for_csv(value_obj, field.type))
-        writer.writerow(row)
-
-    output.seek(0)
-    response = StreamingResponse(output, media_type="text/csv")
-    response.headers["Content-Disposition"] = f"attachment; filename=table_{table.name.replace(' ','_')}_{table_id}_export.csv"
-    return response
+    export_fields = get_table_schema(db, table_id).select(crud.parse_field_ids(fields))
+    return table, [(field.id, field.name, field.type) for field in export_fields]
 
 
-@router.post("/{table_id}/import_csv")
-async def import_csv_to_table(
-    table_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
-):
+def get_import_field_map(db: Session, table_id: int, user_id: int) -> Dict[str, CachedField]:
     # Verify user has at least editor permission for the table
-    permission = crud.get_user_table_permission_level(db, table_id=table_id, user_id=current_user.id)
-    if not permission or permission < PermissionLevel.EDITOR:
+    permission = crud.get_user_table_permission_level(db, table_id=table_id, user_id=user_id)
+    if not has_permission(permission, PermissionLevel.EDITOR):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to import data to this table")
 
     table = db.query(models.Table).filter(models.Table.id == table_id).first()
     if not table:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Table not found")
 
-    # Read and parse CSV content
-    contents = await file.read()
+    # Map field names to their Field objects for quick lookup and type info
+    # For simplicity, assume column headers match Field.name exactly (case-sensitive for now)
+    return get_table_schema(db, table_id).fields_by_name(exclude_formulas=True) # Exclude formula fields
+
+
+# Background CSV jobs (?background=true): the upload or the export file is kept under jobs.JOBS_DIRECTORY
+@jobs.job_handler('csv_export')
+def run_csv_export_job(job: jobs.JobContext) -> dict:
+    export_fields = [tuple(field) for field in job.params["fields"]]
+    file_path = os.path.join(jobs.JOBS_DIRECTORY, job.params["file_name"])
+    db = SessionLocal()
     try:
-        csv_data = io.StringIO(contents.decode('utf-8-sig')) # Handle UTF-8 with BOM
-    except UnicodeDecodeError:
-        try: # Fallback to latin-1 if utf-8 fails
-            csv_data = io.StringIO(contents.decode('latin-1'))
-        except UnicodeDecodeError:
-            raise HTTPException(status_code=400, detail="Failed to decode CSV. Please ensure it's UTF-8 or Latin-1 encoded.")
+        total = db.query(models.Record).filter(models.Record.table_id == job.table_id).count()
+        resuming = "bytes_written" in job.state
+        if resuming: os.truncate(file_path, job.state["bytes_written"]) # Drop rows written after the last checkpoint
+        processed = job.processed if resuming else 0
+        with open(file_path, "a" if resuming else "w", newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            if not resuming: writer.writerow(["record_id"] + [field_name for _, field_name, _ in export_fields])
+            last_record_id = job.state.get("last_record_id", 0)
+            while True:
+                # One query per chunk (keyset on record id): no cursor stays open across the checkpoint commits
+                chunks = crud.iter_table_record_values(job.table_id, [field_id for field_id, _, _ in export_fields], chunk_size=settings.CSV_EXPORT_CHUNK_SIZE, after_record_id=last_record_id, user_id=job.owner_id)
+                chunk = next(chunks, None); chunks.close()
+                if chunk is None: break
+                for record_id, values_map in chunk: writer.writerow(csv_record_row(record_id, values_map, export_fields))
+                output.flush()
+                processed += len(chunk)
+                last_record_id = chunk[-1][0]
+                job.commit_chunk(db, processed, total=total, last_record_id=last_record_id, bytes_written=output.tell())
+        return {"file_name": job.params["download_name"], "records": processed}
+    finally:
+        db.close()
+
+
+@jobs.job_handler('csv_import')
+def run_csv_import_job(job: jobs.JobContext) -> dict:
+    file_path = os.path.join(jobs.JOBS_DIRECTORY, job.params["file_name"])
+    db = SessionLocal()
+    try:
+        field_map = get_table_schema(db, job.table_id).fields_by_name(exclude_formulas=True)
+        errors = list(job.state.get("errors", [])) # Parse and insert errors of the rows already committed
+        success_count = job.state.get("success_count", 0)
+        with open(file_path, "rb") as upload:
+            total = job.total if job.total is not None else max(sum(block.count(b"\n") for block in iter(lambda: upload.read(1 << 20), b"")) - 1, 0) # Approximate data rows
+            upload.seek(0)
+            def commit_chunk(chunk_db, last_row, chunk_success_count):
+                job.commit_chunk(chunk_db, last_row - 1, total=total, last_row=last_row, success_count=success_count + chunk_success_count, errors=errors)
+            rows = iter_csv_rows(upload, field_map, errors, start_after_row=job.state.get("last_row", 1))
+            try:
+                success_count += crud.import_records(db, job.table_id, job.owner_id, rows, settings.CSV_IMPORT_CHUNK_SIZE, errors, on_chunk=commit_chunk)
+            finally:
+                rows.close() # Before the file, if the import stopped midway
+        os.remove(file_path)
+        if success_count: job.broadcast(crud.records_imported_event(job.table_id, success_count))
+        return crud.import_summary(success_count, errors)
+    finally:
+        db.close()
 
-    reader = csv.DictReader(csv_data)
 
-    table_fields = db.query(models.Field).filter(models.Field.table_id == table_id).all()
-    # Map field names to their Field objects for quick lookup and type info
-    # For simplicity, assume CSV headers match Field.name exactly (case-sensitive for now)
-    field_map = {field.name: field for field in table_fields if field.type != 'formula'} # Exclude formula fields
+@router.get("/{table_id}/export_csv")
+async def export_table_to_csv(
+    table_id: int,
+    background_tasks: BackgroundTasks,
+    fields: Optional[str] = None, # Comma-separated field ids to export; all fields when omitted
+    background: bool = False, # Run as a job and return it (202); the file is then downloaded from /jobs/{job_id}/download
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    table, export_fields = get_export_table_fields(db, table_id, current_user.id, fields)
+    download_name = f"table_{table.name.replace(' ','_')}_{table_id}_export.csv"
+
+    if background:
+        os.makedirs(jobs.JOBS_DIRECTORY, exist_ok=True)
+        params = {"fields": export_fields, "file_name": f"export_{uuid.uuid4().hex}.csv", "download_name": download_name}
+        db_job = jobs.create_job(db, 'csv_export', owner_id=current_user.id, table_id=table_id, params=params)
+        background_tasks.add_task(jobs.submit_job, db_job.id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(schemas.Job.model_validate(db_job)))
+
+    def csv_chunks():
+        # Written one chunk of records at a time, so memory stays bounded by CSV_EXPORT_CHUNK_SIZE whatever the table size
+        output = io.StringIO()
+        writer = csv.writer(output)
+        # Header row: Record ID + Field Names, sent before any record is read
+        writer.writerow(["record_id"] + [field_name for _, field_name, _ in export_fields])
+        yield output.getvalue()
+        for chunk in crud.iter_table_record_values(table_id, [field_id for field_id, _, _ in export_fields], chunk_size=settings.CSV_EXPORT_CHUNK_SIZE):
+            output.seek(0); output.truncate(0)
+            for record_id, values_map in chunk:
+                writer.writerow(csv_record_row(record_id, values_map, export_fields))
+            yield output.getvalue()
+
+    response = StreamingResponse(csv_chunks(), media_type="text/csv")
+    response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    return response
+
 
-    success_count = 0
-    error_count = 0
+@router.post("/{table_id}/import_csv")
+async def import_csv_to_table(
+    table_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    background: bool = False, # Run as a job and return it (202); the summary below becomes the job's result
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    field_map = get_import_field_map(db, table_id, current_user.id)
+
+    if background:
+        # The upload is copied next to the job so it can be resumed after a restart
+        os.makedirs(jobs.JOBS_DIRECTORY, exist_ok=True)
+        file_name = f"import_{uuid.uuid4().hex}.csv"
+        with open(os.path.join(jobs.JOBS_DIRECTORY, file_name), "wb") as saved_upload:
+            await run_in_threadpool(shutil.copyfileobj, file.file, saved_upload)
+        db_job = jobs.create_job(db, 'csv_import', owner_id=current_user.id, table_id=table_id, params={"file_name": file_name})
+        background_tasks.add_task(jobs.submit_job, db_job.id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(schemas.Job.model_validate(db_job)))
+
+    # The spooled upload is decoded and parsed a line at a time in crud's worker thread, never read whole
     errors = []
+    # Using current_user.id as owner of imported records; inserted in bulk, one transaction per chunk
+    success_count = await crud.import_table_records(db, table_id=table_id, user_id=current_user.id, rows=iter_csv_rows(file.file, field_map, errors), errors=errors, chunk_size=settings.CSV_IMPORT_CHUNK_SIZE)
+    return crud.import_summary(success_count, errors)
 
-    for row_idx, row_dict in enumerate(reader):
-        record_values_payload: Dict[int, Any] = {}
-        valid_row = True
 
-        for header_name, cell_value_str in row_dict.items():
-            field = field_map.get(header_name)
-            if not field: # Column in CSV not found as a field in the table or is a formula field
-                # Optionally log this or allow ignoring unknown columns
-                continue
+def get_columnar_format(format: str) -> str:
+    if format not in columnar.COLUMNAR_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid format. Must be one of: {', '.join(columnar.COLUMNAR_FORMATS)}.")
+    return format
 
-            # Basic type conversion attempt (more robust validation can be added)
-            # crud._map_value_to_record_value_columns expects correctly typed values for some types (like list for multiSelect)
-            # For CSV, all values are strings initially.
-
-            typed_value: Any = cell_value_str # Default to string
-
-            if cell_value_str is None or cell_value_str == "": # Treat empty strings as None for nullable fields
-                typed_value = None
-            elif field.type == 'number' or field.type == 'count':
-                try: typed_value = float(cell_value_str)
-                except ValueError: errors.append({"row": row_idx + 2, "field": header_name, "error": "Invalid number format"}); valid_row = False; break
-            elif field.type == 'boolean':
-                typed_value = cell_value_str.lower() in ['true', '1', 'yes', 't']
-            elif field.type == 'date' or field.type == 'createdTime' or field.type == 'lastModifiedTime':
-                # Expect ISO format or let Pydantic/SQLAlchemy handle it if possible.
-                # For now, pass as string. More robust parsing needed for various date formats.
-                typed_value = cell_value_str
-            elif field.type == 'multiSelect' or field.type == 'linkToRecord':
-                # Expect comma-separated string, convert to list of strings/ints
-                items = [item.strip() for item in cell_value_str.split(',') if item.strip()]
-                if field.type == 'linkToRecord':
-                    try: typed_value = [int(item) for item in items]
-                    except ValueError: errors.append({"row": row_idx + 2, "field": header_name, "error": "Invalid list of IDs for linkToRecord"}); valid_row = False; break
-                else: # multiSelect
-                    typed_value = items
-            elif field.type == 'attachment': # Expect semi-colon separated list of filenames or JSON string
-                # For simplicity, import won't create attachments from filenames.
-                # Expects JSON string of metadata list, or skip. For now, skip complex parsing.
-                typed_value = None # Or parse if a specific format is defined for CSV import
-
-            if valid_row:
-                record_values_payload[field.id] = typed_value
-
-        if not valid_row:
-            error_count += 1
-            continue
-
-        if not record_values_payload: # Skip empty rows or rows with no matching headers
-            errors.append({"row": row_idx + 2, "error": "No data found for any known fields in this row."})
-            error_count += 1
-            continue
-
-        record_create_schema = schemas.RecordCreate(values=record_values_payload)
-        try:
-            # Using current_user.id as owner of imported records
-            await crud.create_table_record(
-                db=db,
-                record_data=record_create_schema,
-                table_id=table_id,
-                user_id=current_user.id # Or table.owner_id if preferred for imported data
-            )
-            success_count += 1
-        except HTTPException as he: # Catch HTTPExceptions from CRUD if any validation fails there
-            errors.append({"row": row_idx + 2, "error": f"HTTP {he.status_code}: {he.detail}"})
-            error_count += 1
-        except ValueError as ve: # Catch ValueErrors from _map_value_to_record_value_columns
-             errors.append({"row": row_idx + 2, "error": str(ve)})
-             error_count += 1
-        except Exception as e:
-            errors.append({"row": row_idx + 2, "error": f"An unexpected error occurred: {str(e)}"})
-            error_count += 1
-            # For critical errors, might re-raise or stop processing.
-
-    return {
-        "message": f"CSV import completed. {success_count} records imported, {error_count} rows failed.",
-        "success_count": success_count,
-        "error_count": error_count,
-        "errors": errors,
-    }
+
+@router.get("/tables/{table_id}/export")
+async def export_table_columnar(
+    table_id: int,
+    format: str = 'parquet', # "parquet" or "arrow" (Arrow IPC stream)
+    fields: Optional[str] = None, # Comma-separated field ids to export; all fields when omitted
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    # Typed columns (see columnar.arrow_type), zstd-compressed, streamed one record batch at a time like the CSV export
+    format = get_columnar_format(format)
+    table, export_fields = get_export_table_fields(db, table_id, current_user.id, fields)
+    schema = columnar.arrow_schema(export_fields)
+
+    def record_batches():
+        for chunk in crud.iter_table_record_values(table_id, [field_id for field_id, _, _ in export_fields], chunk_size=settings.COLUMNAR_BATCH_SIZE):
+            yield columnar.record_batch(schema, export_fields, chunk)
+
+    media_type, extension = columnar.COLUMNAR_FORMATS[format]
+    response = StreamingResponse(columnar.iter_columnar_bytes(format, schema, record_batches()), media_type=media_type)
+    response.headers["Content-Disposition"] = f"attachment; filename=table_{table.name.replace(' ','_')}_{table_id}_export.{extension}"
+    return response
+
+
+@router.post("/tables/{table_id}/import")
+async def import_columnar_to_table(
+    table_id: int,
+    file: UploadFile = File(...),
+    format: str = 'parquet', # "parquet" or "arrow" (Arrow IPC stream or file)
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    # Columns are matched to fields by name, as CSV headers are; the response is the same as the CSV import's
+    format = get_columnar_format(format)
+    field_map = get_import_field_map(db, table_id, current_user.id)
+    errors = []
+    try:
+        rows = columnar.iter_columnar_rows(file.file, format, field_map, errors, batch_size=settings.CSV_IMPORT_CHUNK_SIZE)
+        success_count = await crud.import_table_records(db, table_id=table_id, user_id=current_user.id, rows=rows, errors=errors, chunk_size=settings.CSV_IMPORT_CHUNK_SIZE)
+    except pa.ArrowException as e: # Not a valid file of that format; batches read before the error stay imported
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not read the {format} file: {e}")
+    return crud.import_summary(success_count, errors, file_kind=format.capitalize())
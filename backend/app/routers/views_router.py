@@ -1,10 +1,10 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Response
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import auth, crud, models, schemas
-from ..database import get_db
+from .. import auth, crud, fast_json, schemas
+from ..database import get_async_db
 
 router = APIRouter(
     tags=["views"],
@@ -15,42 +15,57 @@ router = APIRouter(
 async def create_view_for_table_endpoint(
     table_id: int,
     view_data: schemas.ViewCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.create_table_view handles table ownership check
-    return crud.create_table_view(db=db, view_data=view_data, table_id=table_id, user_id=current_user.id)
+    return await db.run_sync(crud.create_table_view, view_data=view_data, table_id=table_id, user_id=current_user.id)
 
 @router.get("/tables/{table_id}/views", response_model=List[schemas.View])
 async def read_views_for_table_endpoint(
     table_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.get_views_by_table handles table ownership check
-    return crud.get_views_by_table(db=db, table_id=table_id, user_id=current_user.id)
+    return await db.run_sync(crud.get_views_by_table, table_id=table_id, user_id=current_user.id)
 
 @router.get("/views/{view_id}", response_model=schemas.View)
 async def read_view_endpoint(
     view_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.get_view handles ownership check
-    db_view = crud.get_view(db=db, view_id=view_id, user_id=current_user.id)
+    db_view = await db.run_sync(crud.get_view, view_id=view_id, user_id=current_user.id)
     if db_view is None: # Should be handled by crud.get_view raising exception
         raise HTTPException(status_code=404, detail="View not found or insufficient permissions")
     return db_view
 
+@router.get("/views/{view_id}/records", response_model=List[schemas.Record])
+async def read_view_records_endpoint(
+    view_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None, # next_cursor of the previous page (X-Next-Cursor header)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
+):
+    # crud.get_view_records_page applies the view's filters, sorts and visible fields in one query
+    page = await db.run_sync(crud.get_view_records_page, view_id=view_id, user_id=current_user.id, limit=limit, cursor=cursor)
+    response = fast_json.FastJSONResponse(page.records) # Already shaped as List[schemas.Record]; not validated again
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
+
 @router.put("/views/{view_id}", response_model=schemas.View)
 async def update_view_endpoint(
     view_id: int,
     view_data: schemas.ViewUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.update_view handles ownership check
-    updated_view = crud.update_view(db=db, view_id=view_id, view_data=view_data, user_id=current_user.id)
+    updated_view = await db.run_sync(crud.update_view, view_id=view_id, view_data=view_data, user_id=current_user.id)
     if updated_view is None: # Should be handled by crud.update_view
         raise HTTPException(status_code=404, detail="View not found or insufficient permissions for update")
     return updated_view
@@ -58,11 +73,11 @@ async def update_view_endpoint(
 @router.delete("/views/{view_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_view_endpoint(
     view_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_user)
 ):
     # crud.delete_view handles ownership check
-    deleted_view = crud.delete_view(db=db, view_id=view_id, user_id=current_user.id)
+    deleted_view = await db.run_sync(crud.delete_view, view_id=view_id, user_id=current_user.id)
     if deleted_view is None: # Should be handled by crud.delete_view
          raise HTTPException(status_code=404, detail="View not found or insufficient permissions for delete")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
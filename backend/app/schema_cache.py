@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .config import settings
+from .database import READ_PRIMARY
+from .formula_engine import FormulaDependencyGraph, get_compiled_formula
+
+# Process-local cache of table schemas: the field definitions of a table, their parsed options and the
+# table's compiled formula graph, keyed by table id. crud invalidates a table when its fields change or it is
+# deleted (write-through, after the commit); each invalidation bumps the table's version, so a schema loaded
+# while a write was committing is not stored. Other processes only see a change once their entry expires
+# (settings.SCHEMA_CACHE_TTL_SECONDS).
+
+
+class CachedField(NamedTuple):
+    # Snapshot of a models.Field row; read paths use it in place of the ORM object (options stay the stored dict)
+    id: int
+    table_id: int
+    owner_id: int
+    name: str
+    type: str
+    options: Optional[dict]
+
+
+class TableSchema:
+    def __init__(self, table_id: int, version: int, fields: List[CachedField]):
+        self.table_id = table_id
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.fields = fields # Ordered by field id
+        self.fields_by_id: Dict[int, CachedField] = {field.id: field for field in fields}
+        self.field_options: Dict[int, schemas.FieldOptions] = {field.id: schemas.FieldOptions.model_validate(field.options or {}) for field in fields}
+        formulas = {field.id: get_compiled_formula(field.id, self.field_options[field.id].formula_string)
+                    for field in fields if field.type == 'formula' and self.field_options[field.id].formula_string}
+        self.formula_graph = FormulaDependencyGraph(formulas) # Shared between requests: read it, never change it
+
+    def fields_by_name(self, exclude_formulas: bool = False) -> Dict[str, CachedField]:
+        return {field.name: field for field in self.fields if not (exclude_formulas and field.type == 'formula')}
+
+    def select(self, field_ids: Optional[List[int]] = None) -> List[CachedField]:
+        # The requested fields of the table (unknown ids ignored), or all of them, in field id order
+        if field_ids is None: return list(self.fields)
+        requested = set(field_ids)
+        return [field for field in self.fields if field.id in requested]
+
+
+_lock = threading.Lock()
+_schemas: Dict[int, TableSchema] = {}
+_versions: Dict[int, int] = {}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get_table_schema(db: Session, table_id: int) -> TableSchema:
+    with _lock:
+        table_schema = _schemas.get(table_id)
+        if table_schema is not None and time.monotonic() - table_schema.loaded_at < settings.SCHEMA_CACHE_TTL_SECONDS:
+            _stats["hits"] += 1
+            return table_schema
+        _stats["misses"] += 1
+        version = _versions.get(table_id, 0)
+    db_fields = db.query(models.Field).filter(models.Field.table_id == table_id).order_by(models.Field.id).execution_options(**READ_PRIMARY).all()
+    table_schema = TableSchema(table_id, version, [CachedField(field.id, field.table_id, field.owner_id, field.name, field.type, field.options) for field in db_fields])
+    with _lock:
+        if _versions.get(table_id, 0) == version: _schemas[table_id] = table_schema # Not invalidated while loading
+    return table_schema
+
+
+def invalidate_table_schema(table_id: int) -> None:
+    with _lock:
+        _versions[table_id] = _versions.get(table_id, 0) + 1
+        _schemas.pop(table_id, None)
+        _stats["invalidations"] += 1
+
+
+def clear_schema_cache() -> None:
+    with _lock:
+        for table_id in _schemas: _versions[table_id] = _versions.get(table_id, 0) + 1
+        _schemas.clear()
+
+
+def schema_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {**_stats, "tables": len(_schemas), "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None}
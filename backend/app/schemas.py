@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Any
+from pydantic import BaseModel, EmailStr, model_validator
+from typing import Optional, List, Any, Dict, Literal
 from datetime import datetime
 
 # User Schemas
@@ -326,3 +326,51 @@ class Record(BaseModel): # No RecordBase needed if response always has these fie
 
     class Config:
         from_attributes = True
+
+class RecordPage(BaseModel): # Internal result of crud.get_records_page; routers return .records
+    records: List[dict] = [] # Records shaped as Record (crud._record_dict), sent with fast_json.FastJSONResponse
+    columnar: Optional[dict] = None # The page as one array per field (crud._columnar_records), for ?format=columnar
+    formula_query_path: Optional[Literal['sql', 'memory']] = None # How a sort/filter on a formula field was executed
+    next_cursor: Optional[str] = None # Opaque keyset cursor for the following page, None on the last page
+
+# Batch record operations (/tables/{table_id}/records:batch)
+class RecordBatchCreate(BaseModel):
+    records: List[RecordCreate]
+
+class RecordBatchUpdateItem(RecordUpdate):
+    id: int # Only the fields present in values are changed
+
+class RecordBatchUpdate(BaseModel):
+    records: List[RecordBatchUpdateItem]
+
+class RecordBatchDelete(BaseModel):
+    record_ids: List[int]
+
+class RecordBatchItemResult(BaseModel):
+    index: int # Position of the item in the request
+    record_id: Optional[int] = None
+    record: Optional[Record] = None # Created or updated record; None for deletes and failed items
+    error: Optional[str] = None
+
+class RecordBatchResult(BaseModel):
+    results: List[RecordBatchItemResult] = []
+    success_count: int = 0
+    error_count: int = 0
+
+# Background job schemas
+class Job(BaseModel):
+    id: int
+    type: str
+    status: str # queued, running, succeeded, failed
+    table_id: Optional[int] = None
+    processed: int = 0
+    total: Optional[int] = None
+    result: Optional[Any] = None # e.g. the import summary, or the export's download availability
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
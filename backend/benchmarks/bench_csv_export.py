@@ -0,0 +1,139 @@
+"""
+Benchmark: peak RSS, time to first byte and throughput of the CSV export.
+
+Compares the previous export (every record loaded as a DTO, the whole CSV built in one
+StringIO before sending) with the streaming export (records read in chunks through
+crud.iter_table_record_values and written chunk by chunk), and with the typed Parquet and
+Arrow exports (GET /tables/{id}/export?format=...). Each run happens in its own
+process so peak RSS (ru_maxrss) is measured per run. Uses a temporary SQLite database.
+
+Run from the backend directory:
+    python benchmarks/bench_csv_export.py [row counts...]   (default: 10000 100000 1000000)
+"""
+import csv
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+FIELD_TYPES = ("number", "text", "boolean", "number")
+INSERT_CHUNK_SIZE = 50_000
+
+
+def create_database(path: str, rows: int):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, str(BACKEND_DIR))
+    from sqlalchemy import insert
+    from app import models
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = models.User(email="bench@example.com", password_hash="x")
+    db.add(user); db.flush()
+    base = models.Base(name="bench", owner_id=user.id)
+    db.add(base); db.flush()
+    table = models.Table(name="bench", base_id=base.id, owner_id=user.id)
+    db.add(table); db.flush()
+    fields = [models.Field(table_id=table.id, owner_id=user.id, name=f"{field_type}_{i}", type=field_type) for i, field_type in enumerate(FIELD_TYPES)]
+    db.add_all(fields); db.flush()
+    formula = models.Field(table_id=table.id, owner_id=user.id, name="formula", type="formula", options={"formula_string": f"{{{fields[0].id}}} * 2 + {{{fields[3].id}}}"})
+    db.add(formula); db.commit()
+    table_id, user_id, field_ids, formula_id = table.id, user.id, [field.id for field in fields], formula.id
+    for start in range(0, rows, INSERT_CHUNK_SIZE):
+        count = min(INSERT_CHUNK_SIZE, rows - start)
+        record_ids = [row.id for row in db.execute(insert(models.Record.__table__).returning(models.Record.id), [{"table_id": table_id, "owner_id": user_id}] * count)]
+        values = []
+        for i, record_id in zip(range(start, start + count), record_ids):
+            for field_id, columns in ((field_ids[0], {"value_number": float(i)}), (field_ids[1], {"value_text": f"row {i}"}), (field_ids[2], {"value_boolean": i % 2 == 0}),
+                                      (field_ids[3], {"value_number": float(i % 7)}), (formula_id, {"value_number": float(i * 2 + i % 7)})):
+                values.append({"record_id": record_id, "field_id": field_id, "owner_id": user_id, "value_number": None, "value_text": None, "value_boolean": None, **columns})
+        db.execute(insert(models.RecordValue.__table__), values)
+        db.commit()
+    db.close()
+
+
+def export(mode: str):
+    """Runs one export in this process; returns (seconds to first byte, total seconds, bytes, records)."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    from sqlalchemy.orm import selectinload
+    from app import columnar, crud, models
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.routers.tables_router import format_value_for_csv
+
+    db = SessionLocal()
+    table_id = db.query(models.Table.id).scalar() # The only table in the benchmark database
+    export_fields = [(field.id, field.name, field.type) for field in db.query(models.Field).filter(models.Field.table_id == table_id).order_by(models.Field.id)]
+    started = time.perf_counter()
+    first_byte, total_bytes, records = None, 0, 0
+    if mode == "buffered":
+        # The export as it was: all records as DTOs, then the whole file in one StringIO
+        records_sa = db.query(models.Record).filter(models.Record.table_id == table_id).options(selectinload(models.Record.values)).order_by(models.Record.id).limit(1000000).all()
+        records_data = [crud._record_to_dto(record_sa) for record_sa in records_sa]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["record_id"] + [field_name for _, field_name, _ in export_fields])
+        for record_dto in records_data:
+            values_map = {val.field_id: val for val in record_dto.values}
+            writer.writerow([str(record_dto.id)] + [format_value_for_csv(values_map.get(field_id), field_type) for field_id, _, field_type in export_fields])
+        chunks, records = [output.getvalue()], len(records_data)
+    elif mode in columnar.COLUMNAR_FORMATS:
+        schema = columnar.arrow_schema(export_fields)
+        batch_rows = []
+        def record_batches():
+            for chunk in crud.iter_table_record_values(table_id, [field_id for field_id, _, _ in export_fields], chunk_size=settings.COLUMNAR_BATCH_SIZE):
+                batch_rows.append(len(chunk))
+                yield columnar.record_batch(schema, export_fields, chunk)
+        chunks = columnar.iter_columnar_bytes(mode, schema, record_batches())
+    else:
+        def stream():
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(["record_id"] + [field_name for _, field_name, _ in export_fields])
+            yield output.getvalue()
+            for chunk in crud.iter_table_record_values(table_id, [field_id for field_id, _, _ in export_fields], chunk_size=settings.CSV_EXPORT_CHUNK_SIZE):
+                output.seek(0); output.truncate(0)
+                for record_id, values_map in chunk:
+                    writer.writerow([str(record_id)] + [format_value_for_csv(values_map.get(field_id), field_type) for field_id, _, field_type in export_fields])
+                yield output.getvalue()
+        chunks = stream()
+    for data in chunks:
+        if first_byte is None: first_byte = time.perf_counter() - started
+        total_bytes += len(data)
+        if mode == "streaming": records += data.count("\n")
+    if mode == "streaming": records -= 1 # Header line
+    if mode in columnar.COLUMNAR_FORMATS: records = sum(batch_rows)
+    db.close()
+    return first_byte, time.perf_counter() - started, total_bytes, records
+
+
+def main(row_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            path = os.path.join(tmp, f"bench_{rows}.db")
+            subprocess.run([sys.executable, __file__, "--create", path, str(rows)], check=True)
+            for mode in ("buffered", "streaming", "parquet", "arrow"):
+                run = subprocess.run([sys.executable, __file__, "--export", mode, path], capture_output=True, text=True)
+                if run.returncode != 0: # e.g. the buffered export killed for running out of memory
+                    print(f"{rows:>9,} rows  {mode:9s}  failed with exit code {run.returncode}"); continue
+                output = run.stdout.split()
+                first_byte, seconds, total_bytes, records, peak_rss_kb = float(output[0]), float(output[1]), int(output[2]), int(output[3]), int(output[4])
+                print(f"{rows:>9,} rows  {mode:9s}  peak RSS {peak_rss_kb / 1024:8.1f} MB  first byte {first_byte * 1000:9.1f} ms  "
+                      f"total {seconds:7.2f} s  {records / seconds:10,.0f} rows/s  {total_bytes / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--create"]:
+        create_database(sys.argv[2], int(sys.argv[3]))
+    elif sys.argv[1:2] == ["--export"]:
+        os.environ["DATABASE_URL"] = f"sqlite:///{sys.argv[3]}"
+        first_byte, seconds, total_bytes, records = export(sys.argv[2])
+        print(first_byte, seconds, total_bytes, records, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
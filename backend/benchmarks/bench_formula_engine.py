@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: per-record cost of evaluating formula fields.
+
+Compares the previous string-rewriting evaluator (re.sub + regex check + eval of the
+rewritten text for every record) with a formula compiled once per field, evaluated
+record by record and column-at-a-time over the whole page.
+
+Run from the backend directory:
+    python benchmarks/bench_formula_engine.py
+"""
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.formula_engine import evaluate_formula_batch, get_field_value_from_map, get_compiled_formula # noqa: E402
+
+
+def legacy_evaluate_formula(formula_string, record_values_map, field_defs_map):
+    """The evaluator as it was before formulas were compiled, kept here as the baseline."""
+    if not formula_string:
+        return None
+    processed_formula = re.sub(r"\{(\d+)\}", lambda m: str(get_field_value_from_map(f"field_{m.group(1)}", record_values_map, field_defs_map) or 0), formula_string)
+    if not re.match(r"^[0-9\.\s\(\)\+\-\*\/]*$", processed_formula):
+        return "Error: Invalid characters in formula"
+    try:
+        result = eval(processed_formula, {"__builtins__": {}}, {})
+        return result if isinstance(result, (int, float)) else "Error: Formula result is not a number"
+    except ZeroDivisionError:
+        return "Error: Division by zero"
+    except SyntaxError:
+        return "Error: Syntax error in formula"
+    except TypeError:
+        return "Error: Type error in formula (e.g., mixing text and numbers)"
+    except Exception:
+        return "Error: Formula evaluation failed"
+
+
+class BenchField:
+    def __init__(self, id, type):
+        self.id = id
+        self.type = type
+
+
+class BenchValue:
+    def __init__(self, field_id, value_number=None, value_boolean=None):
+        self.field_id = field_id
+        self.value_number = value_number
+        self.value_boolean = value_boolean
+        self.value_text = None
+
+
+FORMULAS = {
+    101: "{1} + {2}",
+    102: "({1} * {2}) / ({3} + 1)",
+    103: "{1} - {2} * 2 + {4}",
+    104: "({1} + {2} + {3}) / 3",
+    105: "{2} / {3}",
+}
+
+
+def main(records: int = 10_000):
+    field_defs = {1: BenchField(1, "number"), 2: BenchField(2, "number"), 3: BenchField(3, "number"), 4: BenchField(4, "boolean")}
+    rows = [
+        {1: BenchValue(1, float(i)), 2: BenchValue(2, float(i % 17)), 3: BenchValue(3, float(i % 5)), 4: BenchValue(4, value_boolean=i % 2 == 0)}
+        for i in range(records)
+    ]
+
+    def run_legacy():
+        for values in rows:
+            for formula in FORMULAS.values():
+                legacy_evaluate_formula(formula, values, field_defs)
+
+    def run_compiled():
+        for values in rows:
+            for field_id, formula in FORMULAS.items():
+                get_compiled_formula(field_id, formula).evaluate(values, field_defs)
+
+    def run_batch():
+        for field_id, formula in FORMULAS.items():
+            evaluate_formula_batch(get_compiled_formula(field_id, formula), rows, field_defs)
+
+    evaluations = records * len(FORMULAS)
+    runs = (("legacy (re.sub + eval per record)", run_legacy), ("compiled (cached per field)", run_compiled), ("compiled, column-at-a-time", run_batch))
+    for name, fn in runs:
+        seconds = min(timeit.repeat(fn, number=1, repeat=3))
+        print(f"{name:36s} {seconds * 1000:8.1f} ms total, {seconds / evaluations * 1e6:6.2f} us per formula per record")
+
+
+if __name__ == "__main__":
+    main()
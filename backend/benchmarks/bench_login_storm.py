@@ -0,0 +1,89 @@
+"""
+Benchmark: event-loop lag during a login storm.
+
+Fires concurrent POST /auth/login requests at the app in-process (httpx ASGITransport, same event loop) while a
+monitor task sleeps 5 ms at a time and records how late it wakes up: the time the loop was unavailable to anything
+else, e.g. WebSocket broadcasts. Compares bcrypt run inline on the event loop (as the login endpoint used to) with
+the bounded password hashing pool (PASSWORD_HASH_WORKERS threads, 429 beyond PASSWORD_HASH_MAX_PENDING).
+Uses a temporary SQLite database and BCRYPT_ROUNDS from the settings.
+
+Run from the backend directory:
+    python benchmarks/bench_login_storm.py [concurrent logins...]   (default: 20 100)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+MONITOR_INTERVAL = 0.005
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else 0.0
+
+
+async def run_inline(fn, *args):
+    return fn(*args) # The previous behaviour: bcrypt on the event loop
+
+
+async def storm(app, logins: int):
+    import httpx
+    lags, latencies, statuses = [], [], []
+    done = asyncio.Event()
+
+    async def monitor():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(MONITOR_INTERVAL)
+            lags.append(time.perf_counter() - started - MONITOR_INTERVAL)
+
+    async def login(client):
+        started = time.perf_counter()
+        response = await client.post("/auth/login", data={"username": "bench@example.com", "password": "bench-password"})
+        latencies.append(time.perf_counter() - started)
+        statuses.append(response.status_code)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench") as client:
+        monitor_task = asyncio.create_task(monitor())
+        started = time.perf_counter()
+        await asyncio.gather(*[login(client) for _ in range(logins)])
+        elapsed = time.perf_counter() - started
+        done.set(); await monitor_task
+    return elapsed, lags, latencies, statuses
+
+
+async def run_storms(app, auth, login_counts):
+    pooled = auth._run_password_hash
+    for logins in login_counts:
+        for mode, run_password_hash in (("inline", run_inline), ("pool", pooled)):
+            auth._run_password_hash = run_password_hash
+            elapsed, lags, latencies, statuses = await storm(app, logins)
+            print(f"{logins:>4} logins  {mode:6s}  {elapsed:6.2f} s  loop lag p99 {percentile(lags, 0.99):7.1f} ms  max {max(lags) * 1000:7.1f} ms  "
+                  f"login p50 {percentile(latencies, 0.5):7.0f} ms  p99 {percentile(latencies, 0.99):7.0f} ms  "
+                  f"200: {statuses.count(200)}  429: {statuses.count(429)}  500: {statuses.count(500)}")
+
+
+
+def main(login_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench_login.db')}"
+        sys.path.insert(0, str(BACKEND_DIR))
+        import main as app_main
+        from app import auth, models
+        from app.config import settings
+        from app.database import Base, SessionLocal, engine
+
+        Base.metadata.create_all(engine)
+        db = SessionLocal()
+        db.add(models.User(email="bench@example.com", password_hash=auth.get_password_hash("bench-password"))); db.commit()
+        db.close()
+        print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_WORKERS} hashing threads, {settings.PASSWORD_HASH_MAX_PENDING} pending at most")
+        asyncio.run(run_storms(app_main.app, auth, login_counts)) # One event loop: the async engine's connections belong to it
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [20, 100])
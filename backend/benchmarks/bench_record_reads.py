@@ -0,0 +1,73 @@
+"""
+Benchmark: records/sec of GET /tables/{table_id}/records, from the database to the response bytes.
+
+Compares the previous read path (ORM records with selectinload'ed values, a schemas.RecordValue per value
+and a schemas.Record per record, then FastAPI's response_model handling: dump, validate again against
+List[schemas.Record], serialize, json.dumps) with the current one (record and value rows as plain dicts,
+crud.get_records_page, encoded by fast_json), and with ?format=columnar (one typed array per field).
+The whole table is read page by page, without sorting.
+Uses a temporary SQLite database with the same table as bench_csv_export.py.
+
+Run from the backend directory:
+    python benchmarks/bench_record_reads.py [record count] [page sizes...]   (default: 20000 100 1000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def read_all(mode: str, page_size: int):
+    """Reads every record of the benchmark table in pages; returns (seconds, records, response bytes)."""
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import selectinload
+    from app import crud, fast_json, models, schemas
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    table_id, user_id = db.query(models.Table.id).scalar(), db.query(models.User.id).scalar()
+    response_adapter = TypeAdapter(List[schemas.Record])
+    started, records, total_bytes, skip = time.perf_counter(), 0, 0, 0
+    while True:
+        if mode == "previous":
+            records_sa = db.query(models.Record).filter(models.Record.table_id == table_id).options(selectinload(models.Record.values)).order_by(models.Record.id).offset(skip).limit(page_size).all()
+            page = [crud._record_to_dto(record_sa) for record_sa in records_sa]
+            # What FastAPI does with the returned models for response_model=List[schemas.Record]
+            content = response_adapter.dump_python(response_adapter.validate_python([record.model_dump() for record in page]), mode="json")
+            body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        elif mode == "columnar":
+            content = crud.get_records_page(db, table_id=table_id, user_id=user_id, skip=skip, limit=page_size, format='columnar').columnar
+            page, body = content["record_ids"], fast_json.dumps(content)
+        else:
+            page = crud.get_records_page(db, table_id=table_id, user_id=user_id, skip=skip, limit=page_size).records
+            body = fast_json.dumps(page)
+        db.expunge_all() # As with a session per request
+        if not page: break
+        records, total_bytes, skip = records + len(page), total_bytes + len(body), skip + page_size
+    db.close()
+    return time.perf_counter() - started, records, total_bytes
+
+
+def main(record_count: int, page_sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_reads.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        sys.path.insert(0, str(BACKEND_DIR))
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from bench_csv_export import create_database
+        create_database(path, record_count)
+        for page_size in page_sizes:
+            for mode in ("previous", "fast", "columnar"):
+                read_all(mode, page_size) # Warm up (imports, compiled statements)
+                seconds, records, total_bytes = read_all(mode, page_size)
+                print(f"{record_count:>7,} records  page {page_size:>5}  {mode:8s}  {seconds:6.2f} s  {records / seconds:9,.0f} records/s  {total_bytes / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 20_000, args[1:] or [100, 1000])
@@ -0,0 +1,111 @@
+"""
+Load test: latency of GET /tables/{table_id}/records under concurrent readers, on a real server.
+
+Starts uvicorn (one worker) on a temporary SQLite database with the same table as bench_csv_export.py, then runs
+concurrent readers fetching random pages for a fixed time, while a probe requests GET /metrics (no database work)
+every 10 ms. With queries blocking the event loop, the probe waits behind every reader's query; with the async
+engine it only waits for their Python work. Prints p50/p99 latency and throughput for both.
+--backend serves another checkout of the backend instead, e.g. an earlier commit, for a before/after comparison.
+
+Run from the backend directory:
+    python benchmarks/load_records.py [--backend DIR] [--records N] [--readers N...] [--seconds S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent
+SECRET_KEY = "load-test-secret"
+
+
+def percentile(latencies, fraction):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else float("nan")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(200):
+        try:
+            await client.get("/metrics"); return
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def run_load(base_url: str, headers: dict, table_id: int, record_count: int, readers: int, seconds: float, page_size: int):
+    reader_latencies, probe_latencies, errors = [], [], 0
+    limits = httpx.Limits(max_connections=readers + 1, max_keepalive_connections=readers + 1)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        await wait_until_up(client)
+        deadline = time.perf_counter() + seconds
+
+        async def reader():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                skip = random.randrange(0, max(record_count - page_size, 1))
+                started = time.perf_counter()
+                response = await client.get(f"/tables/{table_id}/records", params={"skip": skip, "limit": page_size})
+                reader_latencies.append(time.perf_counter() - started)
+                if response.status_code != 200: errors += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/metrics")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *[reader() for _ in range(readers)])
+    return reader_latencies, probe_latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default=str(BACKEND_DIR), help="Backend directory to serve (default: this one)")
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load_records.db")
+        os.environ["SECRET_KEY"] = SECRET_KEY
+        sys.path.insert(0, str(BENCHMARKS_DIR))
+        from bench_csv_export import create_database
+        create_database(path, args.records)
+        from jose import jwt
+        headers = {"Authorization": "Bearer " + jwt.encode({"sub": "bench@example.com", "exp": int(time.time()) + 3600}, SECRET_KEY, algorithm="HS256")}
+
+        port = free_port()
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "SECRET_KEY": SECRET_KEY, "METRICS_ENABLED": "true"}
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"], cwd=args.backend, env=env)
+        try:
+            for readers in args.readers:
+                reader_latencies, probe_latencies, errors = asyncio.run(run_load(f"http://127.0.0.1:{port}", headers, 1, args.records, readers, args.seconds, args.page_size))
+                print(f"{readers:>3} readers  {len(reader_latencies) / args.seconds:7,.0f} pages/s  "
+                      f"page p50 {percentile(reader_latencies, 0.5):7.1f} ms  p99 {percentile(reader_latencies, 0.99):7.1f} ms  "
+                      f"probe p50 {percentile(probe_latencies, 0.5):6.1f} ms  p99 {percentile(probe_latencies, 0.99):7.1f} ms  "
+                      f"max {max(probe_latencies) * 1000 if probe_latencies else float('nan'):7.1f} ms  errors {errors}")
+        finally:
+            server.terminate(); server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from fastapi import FastAPI
-from app.routers import auth_router, bases_router, tables_router, fields_router, records_router, ws_router, views_router, permissions_router, files_router # Import files_router
-from app.database import engine, Base
+from app.routers import auth_router, bases_router, tables_router, fields_router, records_router, ws_router, views_router, permissions_router, files_router, jobs_router, metrics_router # Import files_router
+from app import jobs
+from app.config import settings
+from app.database import REPLICA_URLS, engine, Base
+from app.read_replicas import ReadReplicaMiddleware
 # from app.websocket_manager import manager
 
 # Base.metadata.create_all(bind=engine) # This should be handled by Alembic migrations
 
 app = FastAPI(title="Airtable Clone API")
+if REPLICA_URLS: app.add_middleware(ReadReplicaMiddleware) # GET requests read from the replicas
 
 app.include_router(auth_router.router)
 app.include_router(bases_router.router)
@@ -16,6 +20,13 @@ app.include_router(ws_router.router)
 app.include_router(views_router.router, tags=["views"])
 app.include_router(permissions_router.router)
 app.include_router(files_router.router) # Include files_router
+app.include_router(jobs_router.router)
+if settings.METRICS_ENABLED: app.include_router(metrics_router.router) # Process internals: only where the port is not public
+
+@app.on_event("startup")
+async def resume_background_jobs():
+    # Jobs interrupted by a restart continue from their last committed chunk
+    await jobs.resume_jobs()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,54 @@
+import itertools
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.database import Base
+from app.permission_cache import clear_permission_cache
+from app.principal_cache import clear_principal_cache
+from app.schema_cache import clear_schema_cache
+
+# In-memory SQLite database shared by every connection of a test
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    clear_schema_cache(); clear_permission_cache(); clear_principal_cache() # Table and user ids start over in every test database
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+owner_numbers = itertools.count()
+
+@pytest.fixture
+def owner_table(db):
+    """
+    Factory for the rows most tests start from: owner_table(("n", "number"), ...) commits a user owning a base with
+    one table, plus the given (name, type) or (name, type, options) fields in that order, and returns (owner, table, fields).
+    session= builds them in another session, e.g. the sync session of AsyncSession.run_sync.
+    """
+    def make_owner_table(*field_specs, session=None):
+        session = session or db
+        owner = models.User(email=f"owner{next(owner_numbers)}@example.com", password_hash="x")
+        session.add(owner); session.flush()
+        base = models.Base(name="base", owner_id=owner.id)
+        session.add(base); session.flush()
+        table = models.Table(name="table", base_id=base.id, owner_id=owner.id)
+        session.add(table); session.flush()
+        fields = [models.Field(table_id=table.id, owner_id=owner.id, name=name, type=field_type, options=options[0] if options else None) for name, field_type, *options in field_specs]
+        session.add_all(fields); session.commit()
+        return owner, table, fields
+    return make_owner_table
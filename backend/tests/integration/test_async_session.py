@@ -0,0 +1,39 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.database import Base
+
+# The async endpoints run the same crud code on an AsyncSession (aiosqlite here), through run_sync.
+
+class RecordingManager:
+    def __init__(self):
+        self.messages = []
+
+    async def broadcast_json_to_room(self, message, room):
+        self.messages.append((room, message))
+
+async def write_and_read(owner_table):
+    engine = create_async_engine("sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, autoflush=False, expire_on_commit=False)() as db:
+        user, table, (number,) = await db.run_sync(lambda session: owner_table(("n", "number"), session=session))
+        user_id, table_id, number_id = user.id, table.id, number.id
+        created = await crud.create_table_record(db, schemas.RecordCreate(values={number_id: 2}), table_id=table_id, user_id=user_id)
+        await crud.update_record(db, record_id=created.id, record_data=schemas.RecordUpdate(values={number_id: 3}), user_id=user_id)
+        page = await db.run_sync(crud.get_records_page, table_id=table_id, user_id=user_id)
+        batch = await crud.delete_records_batch(db, table_id=table_id, record_ids=[created.id, created.id + 1], user_id=user_id)
+    await engine.dispose()
+    return created, page, batch
+
+def test_crud_runs_on_an_async_session(owner_table, monkeypatch):
+    manager = RecordingManager()
+    monkeypatch.setattr(crud, "get_connection_manager", lambda: manager)
+    created, page, batch = asyncio.run(write_and_read(owner_table))
+    assert [value.value_number for value in created.values] == [2.0]
+    assert [[value["value_number"] for value in record["values"]] for record in page.records] == [[3.0]]
+    assert (batch.success_count, batch.error_count) == (1, 1)
+    assert [message["event"] for _, message in manager.messages] == ["record_created", "record_updated", "records_batch"]
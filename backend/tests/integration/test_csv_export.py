@@ -0,0 +1,35 @@
+from app import crud, models
+
+# The CSV export reads records through crud.iter_table_record_values in bounded chunks.
+
+def make_table(db, owner_table, record_count):
+    user, table, (number, text) = owner_table(("n", "number"), ("t", "text"))
+    double = models.Field(table_id=table.id, owner_id=user.id, name="double", type="formula", options={"formula_string": f"{{{number.id}}} * 2"})
+    db.add(double); db.flush()
+    records = [models.Record(table_id=table.id, owner_id=user.id) for _ in range(record_count)]
+    db.add_all(records); db.flush()
+    for i, record in enumerate(records[:-1]): # The last record has no values at all
+        db.add_all([
+            models.RecordValue(record_id=record.id, field_id=number.id, owner_id=user.id, value_number=float(i)),
+            models.RecordValue(record_id=record.id, field_id=text.id, owner_id=user.id, value_text=f"t{i}"),
+        ])
+    if records: db.add(models.RecordValue(record_id=records[0].id, field_id=double.id, owner_id=user.id, value_number=100.0)) # Stored result wins
+    db.commit()
+    return table.id, number, text, double, [record.id for record in records]
+
+def test_iter_table_record_values_streams_every_record_in_chunks(db, session_factory, owner_table, monkeypatch):
+    monkeypatch.setattr(crud, "SessionLocal", session_factory)
+    table_id, number, text, double, record_ids = make_table(db, owner_table, 7)
+    chunks = list(crud.iter_table_record_values(table_id, [text.id, double.id], chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    rows = [row for chunk in chunks for row in chunk]
+    assert [record_id for record_id, _ in rows] == record_ids
+    assert [values_map[text.id].value_text for _, values_map in rows[:-1]] == [f"t{i}" for i in range(6)]
+    # Formula results: stored for the first record, evaluated per chunk (with its input loaded) for the rest
+    assert [values_map[double.id].value_number for _, values_map in rows] == [100.0, 2.0, 4.0, 6.0, 8.0, 10.0, 0]
+    assert text.id not in rows[-1][1]
+
+def test_iter_table_record_values_empty_table(db, session_factory, owner_table, monkeypatch):
+    monkeypatch.setattr(crud, "SessionLocal", session_factory)
+    table_id, number, _, _, _ = make_table(db, owner_table, 0)
+    assert list(crud.iter_table_record_values(table_id, [number.id])) == []
@@ -0,0 +1,35 @@
+import asyncio
+
+from app import crud, models
+
+# The CSV import inserts parsed rows through crud.import_table_records in chunked bulk transactions.
+
+class RecordingManager:
+    def __init__(self):
+        self.messages = []
+
+    async def broadcast_json_to_room(self, message, room):
+        self.messages.append((room, message))
+
+def make_table(db, owner_table):
+    user, table, (number,) = owner_table(("n", "number"))
+    double = models.Field(table_id=table.id, owner_id=user.id, name="double", type="formula", options={"formula_string": f"{{{number.id}}} * 2"})
+    db.add(double); db.commit()
+    return user.id, table.id, number.id, double.id
+
+def test_import_table_records_inserts_in_chunks_and_broadcasts_once(engine, db, owner_table, monkeypatch):
+    manager = RecordingManager()
+    monkeypatch.setattr(crud, "get_connection_manager", lambda: manager)
+    user_id, table_id, number_id, double_id = make_table(db, owner_table)
+    rows = [(row_number, {number_id: float(row_number)}) for row_number in range(2, 12)]
+    rows[4] = (6, {number_id: "not a number"})
+    commits = []
+    monkeypatch.setattr(db, "commit", lambda original=db.commit: (commits.append(True), original())[1])
+    errors = []
+    success_count = asyncio.run(crud.import_table_records(db, table_id=table_id, user_id=user_id, rows=iter(rows), errors=errors, chunk_size=4))
+    assert success_count == 9
+    assert errors == [{"row": 6, "error": "Invalid value for number field: not a number"}]
+    assert len(commits) == 3 # 10 rows in chunks of 4
+    assert manager.messages == [(f"table_{table_id}", {"event": "records_imported", "data": {"table_id": table_id, "count": 9}})]
+    stored = dict(db.query(models.RecordValue.record_id, models.RecordValue.value_number).filter(models.RecordValue.field_id == double_id).all())
+    assert sorted(stored.values()) == [float(row_number * 2) for row_number in range(2, 12) if row_number != 6]
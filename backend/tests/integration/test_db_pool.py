@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine, text
+
+from app.database import configure_engine, engine_options, pool_stats
+
+# Engines are built from the DB_POOL_* settings, with the SQLite profile and pool wait stats.
+
+def test_sqlite_file_engine_profile_and_wait_stats(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **engine_options(url))
+    configure_engine(engine)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert type(engine.pool).__name__ == "TimedQueuePool"
+    wait_stats = engine.pool.wait_stats.as_dict()
+    assert (wait_stats["checkouts"], wait_stats["waiting"], wait_stats["timeouts"]) == (2, 0, 0)
+    engine.dispose()
+    assert engine.pool.wait_stats.as_dict()["checkouts"] == 2 # The recreated pool keeps the stats
+
+def test_in_memory_sqlite_keeps_its_pool():
+    options = engine_options("sqlite://")
+    assert "pool_size" not in options and "poolclass" not in options and options["pool_pre_ping"] is True
+
+def test_pool_stats_cover_both_engines():
+    assert set(pool_stats()) == {"sync", "async"}
@@ -0,0 +1,46 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from fastapi import HTTPException
+
+from app import crud, jobs, models, schemas
+from app.schema_cache import get_table_schema
+
+# Formula fields: validated on create like on update, and backfilled for databases that predate stored values.
+
+MIGRATION = Path(__file__).resolve().parents[2] / "alembic" / "versions" / "5e2a8c7d1f03_queue_formula_backfill_jobs.py"
+
+def make_table(owner_table):
+    user, table, (number,) = owner_table(("n", "number"))
+    return user.id, table.id, number.id
+
+def test_create_rejects_self_referencing_formula(db, owner_table):
+    user_id, table_id, number_id = make_table(owner_table)
+    self_reference = schemas.FieldCreate(name="loop", type="formula", options={"formula_string": f"{{{number_id + 1}}} + 1"}) # The new field's id
+    with pytest.raises(HTTPException) as error:
+        crud.create_table_field(db, self_reference, table_id=table_id, user_id=user_id)
+    assert error.value.status_code == 400
+    assert [field.id for field in get_table_schema(db, table_id).fields] == [number_id]
+    assert db.query(models.Field).count() == 1
+
+def test_migration_queues_backfill_of_existing_formula_values(engine, db, session_factory, owner_table, monkeypatch):
+    user_id, table_id, number_id = make_table(owner_table)
+    double = models.Field(table_id=table_id, owner_id=user_id, name="double", type="formula", options={"formula_string": f"{{{number_id}}} * 2"})
+    record = models.Record(table_id=table_id, owner_id=user_id)
+    db.add_all([double, record]); db.flush()
+    db.add(models.RecordValue(record_id=record.id, field_id=number_id, owner_id=user_id, value_number=4.0)); db.commit() # Written before formula values were stored
+
+    spec = importlib.util.spec_from_file_location("queue_formula_backfill_jobs", MIGRATION)
+    migration = importlib.util.module_from_spec(spec); spec.loader.exec_module(migration)
+    with engine.begin() as connection, Operations.context(MigrationContext.configure(connection)):
+        migration.upgrade()
+    (db_job,) = db.query(models.Job).all()
+    assert (db_job.type, db_job.status, db_job.table_id, db_job.owner_id, db_job.params) == ("formula_backfill", "queued", table_id, user_id, {"changed_field_ids": [double.id]})
+
+    monkeypatch.setattr(jobs, "SessionLocal", session_factory); monkeypatch.setattr(crud, "SessionLocal", session_factory)
+    jobs.run_job(db_job.id) # What jobs.resume_jobs does on startup
+    page = crud.get_records_page(session_factory(), table_id=table_id, user_id=user_id)
+    assert {value["field_id"]: value["value_number"] for value in page.records[0]["values"]} == {number_id: 4.0, double.id: 8.0}
@@ -0,0 +1,68 @@
+import pytest
+
+from app import crud, jobs, models
+
+# Background jobs commit their work chunk by chunk with a checkpoint, and resume from it after an interruption.
+
+class Interrupted(BaseException):
+    """Stands in for the process stopping mid-job (not an Exception, so the job is not marked failed)."""
+
+def make_table(db, owner_table, record_count):
+    user, table, (number,) = owner_table(("n", "number"))
+    records = [models.Record(table_id=table.id, owner_id=user.id) for _ in range(record_count)]
+    db.add_all(records); db.flush()
+    db.add_all([models.RecordValue(record_id=record.id, field_id=number.id, owner_id=user.id, value_number=float(i)) for i, record in enumerate(records)])
+    db.commit()
+    return user.id, table.id, number, [record.id for record in records]
+
+@pytest.fixture
+def job_sessions(session_factory, monkeypatch):
+    monkeypatch.setattr(jobs, "SessionLocal", session_factory)
+    monkeypatch.setattr(crud, "SessionLocal", session_factory)
+
+def test_records_delete_job_resumes_after_last_committed_chunk(db, job_sessions, owner_table, monkeypatch):
+    monkeypatch.setattr(crud.settings, "RECORDS_BATCH_MAX_SIZE", 3)
+    user_id, table_id, _, record_ids = make_table(db, owner_table, 8)
+    db_job = jobs.create_job(db, 'records_delete', owner_id=user_id, table_id=table_id, params={"record_ids": record_ids + [10_000]})
+    commit_chunk = jobs.JobContext.commit_chunk
+    def interrupt_after_first_chunk(self, chunk_db, processed, total=None, **state):
+        commit_chunk(self, chunk_db, processed, total=total, **state)
+        raise Interrupted()
+    monkeypatch.setattr(jobs.JobContext, "commit_chunk", interrupt_after_first_chunk)
+    with pytest.raises(Interrupted):
+        jobs.run_job(db_job.id)
+    db.expire_all()
+    assert (db_job.status, db_job.processed, db_job.state) == (jobs.JOB_RUNNING, 3, {"position": 3, "deleted_count": 3})
+    assert db.query(models.Record).count() == 5
+
+    monkeypatch.setattr(jobs.JobContext, "commit_chunk", commit_chunk)
+    assert jobs.requeue_interrupted_jobs(stale_after_seconds=-1) == [db_job.id]
+    jobs.run_job(db_job.id)
+    db.expire_all()
+    assert (db_job.status, db_job.processed, db_job.total) == (jobs.JOB_SUCCEEDED, 9, 9)
+    assert db_job.result == {"deleted_count": 8, "not_found_count": 1}
+    assert db.query(models.Record).count() == 0
+    assert db.query(models.RecordValue).count() == 0
+
+def test_formula_backfill_job_fills_every_record(db, job_sessions, owner_table, monkeypatch):
+    monkeypatch.setattr(crud, "FORMULA_BACKFILL_CHUNK_SIZE", 2)
+    user_id, table_id, number, record_ids = make_table(db, owner_table, 5)
+    double = models.Field(table_id=table_id, owner_id=user_id, name="double", type="formula", options={"formula_string": f"{{{number.id}}} * 2"})
+    db.add(double); db.commit()
+    db_job = jobs.create_job(db, 'formula_backfill', owner_id=user_id, table_id=table_id, params={"changed_field_ids": [double.id]})
+    jobs.run_job(db_job.id)
+    db.expire_all()
+    assert (db_job.status, db_job.processed, db_job.total) == (jobs.JOB_SUCCEEDED, 5, 5)
+    stored = dict(db.query(models.RecordValue.record_id, models.RecordValue.value_number).filter(models.RecordValue.field_id == double.id).all())
+    assert [stored[record_id] for record_id in record_ids] == [0.0, 2.0, 4.0, 6.0, 8.0]
+
+def test_failed_job_records_error(db, job_sessions, owner_table, monkeypatch):
+    user_id, table_id, _, _ = make_table(db, owner_table, 1)
+    db_job = jobs.create_job(db, 'records_delete', owner_id=user_id, table_id=table_id, params={})
+    jobs.run_job(db_job.id)
+    db.expire_all()
+    assert db_job.status == jobs.JOB_FAILED
+    assert db_job.error == "'record_ids'"
+    jobs.run_job(db_job.id) # Only queued jobs are claimed
+    db.expire_all()
+    assert db_job.status == jobs.JOB_FAILED
@@ -0,0 +1,15 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from app.routers import metrics_router
+
+# GET /metrics exposes process internals without authentication, so it is off unless METRICS_ENABLED is set.
+
+def test_metrics_not_served_by_default():
+    assert TestClient(main.app).get("/metrics").status_code == 404
+
+def test_metrics_router_reports_caches_and_pools():
+    app = FastAPI()
+    app.include_router(metrics_router.router)
+    assert {"schema_cache", "permission_cache", "principal_cache", "db_pool"} <= set(TestClient(app).get("/metrics").json())
@@ -0,0 +1,35 @@
+from app import crud, models
+from app.permission_cache import permission_cache_stats
+from app.permission_levels import PermissionLevel
+
+# Table permission levels are memoized per request (session) and cached per process, and evicted by grants and revokes.
+
+def make_tables(db, owner_table, count):
+    # count tables in the owner's base, and a user with no access to them
+    owner, table, _ = owner_table()
+    other = models.User(email="other@example.com", password_hash="x")
+    tables = [table] + [models.Table(name=f"table {i}", base_id=table.base_id, owner_id=owner.id) for i in range(1, count)]
+    db.add_all([other] + tables); db.commit()
+    return owner.id, other.id, [table.id for table in tables]
+
+def test_cached_levels_follow_grants_and_revokes(db, session_factory, owner_table):
+    owner_id, other_id, (table_id, _) = make_tables(db, owner_table, 2)
+    stats = permission_cache_stats()
+    assert crud.get_user_table_permission_level(db, table_id=table_id, user_id=other_id) is None
+    assert crud.get_user_table_permission_level(db, table_id=table_id, user_id=other_id) is None
+    request_db = session_factory() # Another request: served by the process cache
+    assert crud.get_user_table_permission_level(request_db, table_id=table_id, user_id=other_id) is None
+    assert {key: permission_cache_stats()[key] - stats[key] for key in ("misses", "request_hits", "hits")} == {"misses": 1, "request_hits": 1, "hits": 1}
+
+    crud.grant_table_permission(db, table_id=table_id, target_user_id=other_id, permission_level=PermissionLevel.EDITOR, current_user_id=owner_id)
+    assert crud.get_user_table_permission_level(db, table_id=table_id, user_id=other_id) == PermissionLevel.EDITOR
+    assert crud.get_user_table_permission_level(session_factory(), table_id=table_id, user_id=other_id) == PermissionLevel.EDITOR
+    crud.revoke_table_permission(db, table_id=table_id, target_user_id=other_id, current_user_id=owner_id)
+    assert crud.get_user_table_permission_level(session_factory(), table_id=table_id, user_id=other_id) is None
+    request_db.close()
+
+def test_bulk_levels_in_one_query(db, owner_table):
+    owner_id, other_id, table_ids = make_tables(db, owner_table, 3)
+    db.add(models.TablePermission(table_id=table_ids[1], user_id=other_id, permission_level=PermissionLevel.VIEWER.value)); db.commit()
+    assert crud.get_user_table_permission_levels(db, table_ids + [10_000], user_id=owner_id) == {table_ids[0]: PermissionLevel.ADMIN, table_ids[1]: PermissionLevel.ADMIN, table_ids[2]: PermissionLevel.ADMIN, 10_000: None}
+    assert crud.get_user_table_permission_levels(db, table_ids, user_id=other_id) == {table_ids[0]: None, table_ids[1]: PermissionLevel.VIEWER, table_ids[2]: None}
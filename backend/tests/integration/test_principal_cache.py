@@ -0,0 +1,25 @@
+import asyncio
+
+from app import crud, models
+from app.principal_cache import Principal, get_principal, principal_cache_stats
+
+# Token subjects resolve to a Principal (not an ORM object), cached per process and evicted when the user is written.
+
+def test_principal_is_cached_and_evicted_on_user_change(db, session_factory):
+    user = models.User(email="principal@example.com", password_hash="x")
+    db.add(user); db.commit()
+    stats = principal_cache_stats()
+    principal = asyncio.run(get_principal(db, "principal@example.com"))
+    assert isinstance(principal, Principal) and (principal.id, principal.email) == (user.id, "principal@example.com")
+    assert not hasattr(principal, "__dict__")
+    request_db = session_factory()
+    assert asyncio.run(get_principal(request_db, "principal@example.com")) is principal # Another request: no query
+    assert asyncio.run(get_principal(request_db, "nobody@example.com")) is None
+    assert asyncio.run(get_principal(request_db, "nobody@example.com")) is None # Unknown subjects are not cached
+    assert {key: principal_cache_stats()[key] - stats[key] for key in ("hits", "misses")} == {"hits": 1, "misses": 3}
+
+    crud.update_user_password_hash(db, user_id=user.id, password_hash="y")
+    assert principal_cache_stats()["evictions"] == stats["evictions"] + 1
+    reloaded = asyncio.run(get_principal(request_db, "principal@example.com"))
+    assert reloaded is not principal and reloaded.id == user.id
+    request_db.close()
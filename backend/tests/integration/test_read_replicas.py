@@ -0,0 +1,68 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+
+from app import models, read_replicas
+from app.config import settings
+from app.database import READ_PRIMARY, Base, RoutingSession
+
+# Routing between two SQLite files: the primary, and a "replica" holding different rows, so each read shows where it went.
+
+def make_databases(tmp_path):
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(engines[name])
+        with engines[name].begin() as connection:
+            connection.execute(models.User.__table__.insert().values(id=1, email=f"{name}@example.com", password_hash="x"))
+
+    class TwoFileSession(RoutingSession):
+        replicas = [engines["replica"]]
+    return engines, TwoFileSession
+
+def user_email(db, **execution_options):
+    return db.execute(select(models.User.email).where(models.User.id == 1).execution_options(**execution_options)).scalar()
+
+def test_reads_follow_session_kind_and_writes(tmp_path):
+    engines, TwoFileSession = make_databases(tmp_path)
+    with TwoFileSession(bind=engines["primary"]) as db:
+        assert user_email(db) == "primary@example.com" # Not read-only work
+    with TwoFileSession(bind=engines["primary"], info={"read_only": True, "user_id": 501}) as db:
+        assert user_email(db) == "replica@example.com"
+        assert user_email(db, **READ_PRIMARY) == "primary@example.com"
+        db.add(models.User(email="new@example.com", password_hash="x")); db.flush()
+        assert user_email(db) == "primary@example.com" # The session has written
+        db.commit()
+    with TwoFileSession(bind=engines["primary"], info={"read_only": True, "user_id": 501}) as db:
+        assert user_email(db) == "primary@example.com" # Read-your-writes window
+    with TwoFileSession(bind=engines["primary"], info={"read_only": True, "user_id": 502}) as db:
+        assert user_email(db) == "replica@example.com"
+    for engine in engines.values(): engine.dispose()
+
+def test_middleware_marks_reads_and_hands_out_the_token():
+    app = FastAPI()
+    app.add_middleware(read_replicas.ReadReplicaMiddleware)
+
+    @app.get("/routing")
+    def read_routing():
+        routing = read_replicas.current_routing()
+        return {"read_only": routing.read_only, "read_primary": read_replicas.must_read_primary(None)}
+
+    @app.post("/write")
+    def write():
+        read_replicas.record_write(None)
+        return {}
+
+    client = TestClient(app)
+    assert client.get("/routing").json() == {"read_only": True, "read_primary": False}
+    response = client.post("/write")
+    assert read_replicas.READ_PRIMARY_UNTIL_COOKIE in response.cookies
+    assert client.get("/routing").json() == {"read_only": True, "read_primary": True} # The cookie comes back
+    client.cookies.clear()
+    client.cookies.set(read_replicas.READ_PRIMARY_UNTIL_COOKIE, "1e18") # Forged: not signed
+    assert client.get("/routing").json() == {"read_only": True, "read_primary": False}
+    far_future = read_replicas.make_read_primary_token(1e18) # Signed, but beyond the window
+    assert read_replicas.read_primary_until_from_token(far_future) <= time.time() + settings.REPLICA_READ_YOUR_WRITES_SECONDS
+    assert read_replicas.read_primary_until_from_token(far_future.replace(".", "0.", 1)) == 0.0 # Tampered
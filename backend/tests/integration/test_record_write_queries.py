@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from contextlib import contextmanager
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app import crud, models, schemas
+
+# The record write path should issue a fixed number of SQL statements, however many fields a table has.
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try: yield statements
+    finally: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def make_table(db, owner_table, field_count):
+    user, table, fields = owner_table(*[(f"n{i}", "number") for i in range(field_count)], *[(f"t{i}", "text") for i in range(field_count)])
+    number_fields, text_fields = fields[:field_count], fields[field_count:]
+    linked_table = models.Table(name="linked", base_id=table.base_id, owner_id=user.id)
+    db.add(linked_table); db.flush()
+    linked_record = models.Record(table_id=linked_table.id, owner_id=user.id)
+    db.add(linked_record); db.flush()
+    link_fields = [models.Field(table_id=table.id, owner_id=user.id, name=f"l{i}", type="linkToRecord", options={"linked_table_id": linked_table.id}) for i in range(field_count)]
+    db.add_all(link_fields); db.flush()
+    formula_fields = [models.Field(table_id=table.id, owner_id=user.id, name=f"f{i}", type="formula", options={"formula_string": f"{{{field.id}}} * 2"}) for i, field in enumerate(number_fields)]
+    db.add_all(formula_fields); db.commit()
+    values = {field.id: i for i, field in enumerate(number_fields)}
+    values.update({field.id: f"text {i}" for i, field in enumerate(text_fields)})
+    values.update({field.id: [linked_record.id] for field in link_fields})
+    return user.id, table.id, values
+
+def create_record(db, engine, owner_table, field_count):
+    user_id, table_id, values = make_table(db, owner_table, field_count)
+    db.expire_all()
+    with count_statements(engine) as statements:
+        record = asyncio.run(crud.create_table_record(db, schemas.RecordCreate(values=values), table_id=table_id, user_id=user_id))
+    return record, len(statements), user_id, values
+
+def test_create_record_statement_count_does_not_grow_with_fields(engine, db, owner_table):
+    record_small, statements_small, _, _ = create_record(db, engine, owner_table, 2)
+    record_large, statements_large, _, _ = create_record(db, engine, owner_table, 30)
+    assert statements_small == statements_large
+    assert statements_large <= 10
+    assert len(record_large.values) == 30 * 4 # Number, text, link and formula values
+    assert {value.value_number for value in record_large.values if value.value_number is not None} >= {58.0} # Formula on the last number field
+
+def test_update_record_statement_count_does_not_grow_with_fields(engine, db, owner_table):
+    counts = []
+    for field_count in (2, 30):
+        record, _, user_id, values = create_record(db, engine, owner_table, field_count)
+        new_values = {field_id: (value + 1 if isinstance(value, int) else value) for field_id, value in values.items()}
+        db.expire_all()
+        with count_statements(engine) as statements:
+            updated = asyncio.run(crud.update_record(db, record.id, schemas.RecordUpdate(values=new_values), user_id=user_id))
+        counts.append(len(statements))
+        assert len(updated.values) == field_count * 4
+    assert counts[0] == counts[1]
+    assert counts[1] <= 14
+
+def test_create_record_rejects_links_to_other_tables(engine, db, owner_table):
+    user_id, table_id, values = make_table(db, owner_table, 1)
+    link_field_id = next(field_id for field_id, value in values.items() if isinstance(value, list))
+    values[link_field_id] = [record.id for record in db.query(models.Record).all()] + [10_000]
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(crud.create_table_record(db, schemas.RecordCreate(values=values), table_id=table_id, user_id=user_id))
+    assert excinfo.value.status_code == 400 and "cannot be linked" in excinfo.value.detail
+    assert db.query(models.Record).filter(models.Record.table_id == table_id).count() == 0
+    record, _, user_id, values = create_record(db, engine, owner_table, 1)
+    link_field_id = next(field_id for field_id, value in values.items() if isinstance(value, list))
+    with pytest.raises(HTTPException) as excinfo: # The same check on update
+        asyncio.run(crud.update_record(db, record.id, schemas.RecordUpdate(values={link_field_id: [10_000]}), user_id=user_id))
+    assert excinfo.value.status_code == 400
+
+def test_create_records_batch_statement_count_does_not_grow_with_records(engine, db, owner_table):
+    counts = []
+    for record_count in (2, 50):
+        user_id, table_id, values = make_table(db, owner_table, 3)
+        items = [schemas.RecordCreate(values=values) for _ in range(record_count)] + [schemas.RecordCreate(values={next(iter(values)): "not a number"})]
+        db.expire_all()
+        with count_statements(engine) as statements:
+            result = asyncio.run(crud.create_records_batch(db, table_id=table_id, items=items, user_id=user_id))
+        counts.append(len(statements))
+        assert (result.success_count, result.error_count) == (record_count, 1)
+        assert result.results[-1].record is None and "number" in result.results[-1].error
+        assert all(len(item.record.values) == 3 * 4 for item in result.results[:-1])
+    assert counts[0] == counts[1]
+
+def test_update_and_delete_records_batch_statement_counts_do_not_grow_with_records(engine, db, owner_table):
+    update_counts, delete_counts = [], []
+    for record_count in (2, 50):
+        user_id, table_id, values = make_table(db, owner_table, 3)
+        created = asyncio.run(crud.create_records_batch(db, table_id=table_id, items=[schemas.RecordCreate(values=values)] * record_count, user_id=user_id))
+        record_ids = [item.record_id for item in created.results]
+        number_field_id = next(iter(values))
+        items = [schemas.RecordBatchUpdateItem(id=record_id, values={number_field_id: 100}) for record_id in record_ids]
+        db.expire_all()
+        with count_statements(engine) as statements:
+            updated = asyncio.run(crud.update_records_batch(db, table_id=table_id, items=items, user_id=user_id))
+        update_counts.append(len(statements))
+        assert updated.success_count == record_count
+        assert all({value.value_number for value in item.record.values} >= {100.0, 200.0} for item in updated.results) # Formula recomputed
+        assert all(len(item.record.values) == 3 * 4 for item in updated.results) # Fields not in the update are kept
+        db.expire_all()
+        with count_statements(engine) as statements:
+            deleted = asyncio.run(crud.delete_records_batch(db, table_id=table_id, record_ids=record_ids + [10_000], user_id=user_id))
+        delete_counts.append(len(statements))
+        assert (deleted.success_count, deleted.error_count) == (record_count, 1)
+        assert db.query(models.Record).filter(models.Record.table_id == table_id).count() == 0
+    assert update_counts[0] == update_counts[1]
+    assert delete_counts[0] == delete_counts[1]
+
+def test_update_record_writes_only_changed_values(engine, db, owner_table):
+    counts = []
+    for field_count in (2, 30):
+        record, _, user_id, values = create_record(db, engine, owner_table, field_count)
+        number_field_id = next(iter(values))
+        links_before = {link.id for link in db.query(models.RecordLink).filter(models.RecordLink.source_record_id == record.id)}
+        db.expire_all()
+        with count_statements(engine) as statements:
+            updated = asyncio.run(crud.update_record(db, record.id, schemas.RecordUpdate(values={number_field_id: 100}), user_id=user_id))
+        counts.append(len(statements))
+        assert len(updated.values) == field_count * 4 # Unsubmitted values are kept
+        assert {value.value_number for value in updated.values if value.field_id == number_field_id} == {100.0}
+        assert {value.value_number for value in updated.values} >= {200.0} # Its formula was recomputed
+        assert not any(statement.lstrip().upper().startswith("DELETE") for statement in statements)
+        assert {link.id for link in db.query(models.RecordLink).filter(models.RecordLink.source_record_id == record.id)} == links_before
+    assert counts[0] == counts[1]
+
+def test_update_record_diffs_link_sets(engine, db, owner_table):
+    user_id, table_id, values = make_table(db, owner_table, 1)
+    link_field_id = next(field_id for field_id, value in values.items() if isinstance(value, list))
+    linked_table_id = db.get(models.Field, link_field_id).options["linked_table_id"]
+    extra_records = [models.Record(table_id=linked_table_id, owner_id=user_id) for _ in range(2)]
+    db.add_all(extra_records); db.commit()
+    kept_id, new_id, removed_id = values[link_field_id][0], extra_records[0].id, extra_records[1].id
+    values[link_field_id] = [kept_id, removed_id]
+    record = asyncio.run(crud.create_table_record(db, schemas.RecordCreate(values=values), table_id=table_id, user_id=user_id))
+    kept_link_id = db.query(models.RecordLink.id).filter(models.RecordLink.source_record_id == record.id, models.RecordLink.linked_record_id == kept_id).scalar()
+    asyncio.run(crud.update_record(db, record.id, schemas.RecordUpdate(values={link_field_id: [new_id, kept_id]}), user_id=user_id))
+    links = dict(db.query(models.RecordLink.linked_record_id, models.RecordLink.id).filter(models.RecordLink.source_record_id == record.id).all())
+    assert set(links) == {kept_id, new_id}
+    assert links[kept_id] == kept_link_id # Unchanged link rows are not rewritten
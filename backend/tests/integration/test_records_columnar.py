@@ -0,0 +1,45 @@
+import pytest
+from fastapi import HTTPException
+
+from app import crud, models
+
+# ?format=columnar pages: the same records, sorting and cursor as the records format, one typed array per field.
+
+def make_table(db, owner_table):
+    user, table, fields = owner_table(("n", "number"), ("t", "text"), ("b", "boolean"), ("m", "multiSelect"))
+    number, text, boolean, multi = fields
+    records = [models.Record(table_id=table.id, owner_id=user.id) for _ in range(3)]
+    db.add_all(records); db.flush()
+    db.add_all([
+        models.RecordValue(record_id=records[0].id, field_id=number.id, owner_id=user.id, value_number=3.0),
+        models.RecordValue(record_id=records[0].id, field_id=multi.id, owner_id=user.id, value_json=["p", "q"]),
+        models.RecordValue(record_id=records[1].id, field_id=number.id, owner_id=user.id, value_number=1.0),
+        models.RecordValue(record_id=records[1].id, field_id=text.id, owner_id=user.id, value_text="x"),
+        models.RecordValue(record_id=records[2].id, field_id=boolean.id, owner_id=user.id, value_boolean=True),
+    ])
+    db.commit()
+    return user.id, table.id, fields, [record.id for record in records]
+
+def test_columnar_page_matches_records_page(db, owner_table):
+    user_id, table_id, (number, text, boolean, multi), record_ids = make_table(db, owner_table)
+    page = crud.get_records_page(db, table_id=table_id, user_id=user_id, limit=2, sort_by_field_id=number.id, format='columnar')
+    assert page.records == []
+    assert page.columnar == {
+        "table_id": table_id,
+        "fields": [{"id": field.id, "name": field.name, "type": field.type} for field in (number, text, boolean, multi)],
+        "record_ids": [record_ids[1], record_ids[0]],
+        "columns": [[1.0, 3.0], ["x", None], [None, None], [None, ["p", "q"]]],
+    }
+    records_page = crud.get_records_page(db, table_id=table_id, user_id=user_id, limit=2, sort_by_field_id=number.id)
+    assert page.next_cursor == records_page.next_cursor
+    assert [record["id"] for record in records_page.records] == page.columnar["record_ids"]
+
+    rest = crud.get_records_page(db, table_id=table_id, user_id=user_id, limit=2, sort_by_field_id=number.id, cursor=page.next_cursor, field_ids=[boolean.id], format='columnar')
+    assert rest.columnar["fields"] == [{"id": boolean.id, "name": "b", "type": "boolean"}]
+    assert (rest.columnar["record_ids"], rest.columnar["columns"], rest.next_cursor) == ([record_ids[2]], [[True]], None)
+
+def test_unknown_format_is_rejected(db, owner_table):
+    user_id, table_id, _, _ = make_table(db, owner_table)
+    with pytest.raises(HTTPException) as excinfo:
+        crud.get_records_page(db, table_id=table_id, user_id=user_id, format='arrow')
+    assert excinfo.value.status_code == 400
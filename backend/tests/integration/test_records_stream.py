@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from app import crud, models
+
+# NDJSON records: read in chunks by crud.stream_table_records, ingested line by line by crud.ingest_table_records.
+
+class RecordingManager:
+    def __init__(self):
+        self.messages = []
+
+    async def broadcast_json_to_room(self, message, room):
+        self.messages.append((room, message))
+
+def make_table(db, owner_table):
+    user, table, (number,) = owner_table(("n", "number"))
+    double = models.Field(table_id=table.id, owner_id=user.id, name="double", type="formula", options={"formula_string": f"{{{number.id}}} * 2"})
+    db.add(double); db.commit()
+    return user.id, table.id, number.id, double.id
+
+async def as_lines(lines):
+    for line in lines: yield line.encode()
+
+def test_ingest_then_stream_records_in_chunks(db, session_factory, owner_table, monkeypatch):
+    manager = RecordingManager()
+    monkeypatch.setattr(crud, "get_connection_manager", lambda: manager)
+    monkeypatch.setattr(crud, "SessionLocal", session_factory)
+    user_id, table_id, number_id, double_id = make_table(db, owner_table)
+    lines = [json.dumps({"values": {number_id: i}}) for i in range(5)]
+    lines[2:2] = ["", "{", json.dumps({"values": {number_id: "x"}})] # Blank line skipped; line numbers still count it
+    errors = []
+    success_count = asyncio.run(crud.ingest_table_records(db, table_id=table_id, user_id=user_id, lines=as_lines(lines), errors=errors, chunk_size=2))
+    assert success_count == 5
+    assert [(error["row"], error["error"].split(":")[0]) for error in errors] == [(4, "Invalid record"), (5, "Invalid value for number field")]
+    assert manager.messages == [(f"table_{table_id}", {"event": "records_imported", "data": {"table_id": table_id, "count": 5}})]
+
+    chunks = list(crud.stream_table_records(db, table_id=table_id, user_id=user_id, chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    records = [record for chunk in chunks for record in chunk]
+    assert [{value["field_id"]: value["value_number"] for value in record["values"]} for record in records] == [{number_id: float(i), double_id: float(i * 2)} for i in range(5)]
+    assert records == [crud.get_record(db, record_id=record["id"], user_id=user_id) for record in records] # Same records as the JSON API
+    resumed = [record["id"] for chunk in crud.stream_table_records(db, table_id=table_id, user_id=user_id, field_ids=[double_id], after_record_id=records[2]["id"]) for record in chunk]
+    assert resumed == [record["id"] for record in records[3:]]
@@ -0,0 +1,27 @@
+from app import crud, schemas
+from app.schema_cache import get_table_schema, schema_cache_stats
+
+# Table schemas are cached per process and invalidated by the field and table writes in crud.
+
+def test_field_writes_invalidate_cached_schema(db, owner_table):
+    user, table, _ = owner_table()
+    user_id, table_id = user.id, table.id
+    number = crud.create_table_field(db, schemas.FieldCreate(name="n", type="number"), table_id=table_id, user_id=user_id)
+    stats = schema_cache_stats()
+    first = get_table_schema(db, table_id)
+    assert get_table_schema(db, table_id) is first
+    assert (schema_cache_stats()["misses"], schema_cache_stats()["hits"]) == (stats["misses"] + 1, stats["hits"] + 1)
+    assert [field.name for field in first.fields] == ["n"] and first.formula_graph.order == []
+
+    double = crud.create_table_field(db, schemas.FieldCreate(name="double", type="formula", options={"formula_string": f"{{{number.id}}} * 2"}), table_id=table_id, user_id=user_id)
+    second = get_table_schema(db, table_id)
+    assert second is not first and second.version > first.version
+    assert second.formula_graph.order == [double.id] and second.field_options[double.id].formula_string == f"{{{number.id}}} * 2"
+
+    crud.update_field(db, field_id=number.id, field_update=schemas.FieldUpdate(name="m"), user_id=user_id)
+    assert get_table_schema(db, table_id).fields_by_name().keys() == {"m", "double"}
+    crud.delete_field(db, field_id=double.id, user_id=user_id)
+    assert [field.id for field in get_table_schema(db, table_id).fields] == [number.id]
+    crud.delete_table(db, table_id=table_id, user_id=user_id)
+    assert get_table_schema(db, table_id).fields == []
+    assert schema_cache_stats()["invalidations"] == stats["invalidations"] + 4
@@ -0,0 +1,33 @@
+import pytest
+from fastapi import HTTPException
+
+from app import models
+from app.permission_levels import PermissionLevel, has_permission
+from app.routers.tables_router import get_export_table_fields, get_import_field_map
+
+# The CSV and Parquet/Arrow exports and imports check access through these helpers: ranks, not string order.
+
+def make_table(db, owner_table):
+    owner, table, _ = owner_table(("n", "number"))
+    users = {name: models.User(email=f"{name}@example.com", password_hash="x") for name in ("editor", "viewer", "stranger")}
+    db.add_all(users.values()); db.flush()
+    db.add_all([models.TablePermission(table_id=table.id, user_id=users[name].id, permission_level=name) for name in ("editor", "viewer")])
+    db.commit()
+    return table.id, {"owner": owner.id, **{name: user.id for name, user in users.items()}}
+
+def test_permission_ranks():
+    assert has_permission(PermissionLevel.ADMIN, PermissionLevel.EDITOR) and has_permission("editor", PermissionLevel.VIEWER)
+    assert not has_permission(PermissionLevel.VIEWER, PermissionLevel.EDITOR) and not has_permission(None, PermissionLevel.VIEWER)
+
+def test_export_needs_viewer_and_import_needs_editor(db, owner_table):
+    table_id, user_ids = make_table(db, owner_table)
+    for name in ("owner", "editor", "viewer"):
+        table, export_fields = get_export_table_fields(db, table_id, user_ids[name], None)
+        assert table.id == table_id and [field_name for _, field_name, _ in export_fields] == ["n"]
+    for name in ("owner", "editor"):
+        assert list(get_import_field_map(db, table_id, user_ids[name])) == ["n"]
+    for name, check in (("viewer", get_import_field_map), ("stranger", get_import_field_map)):
+        with pytest.raises(HTTPException) as error: check(db, table_id, user_ids[name])
+        assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error: get_export_table_fields(db, table_id, user_ids["stranger"], None)
+    assert error.value.status_code == 403
@@ -1,6 +1,10 @@
+import asyncio
 import pytest
+from fastapi import HTTPException
 from jose import jwt, JWTError
+from passlib.context import CryptContext
 from datetime import timedelta, datetime, timezone
+from app import auth
 from app.auth import create_access_token, get_password_hash, verify_password
 # Assuming app.models and app.crud might be needed for get_current_user, but not for these direct utils
 # from app import models, crud, schemas
@@ -50,3 +54,26 @@ def test_create_access_token_no_sub():
 # integration tests as they depend on DB access (via crud) and FastAPI Depends.
 # These could be mocked for unit tests, but that's more involved.
 # For now, focusing on the utility functions in auth.py.
+
+def bcrypt_context(rounds):
+    return CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+def test_login_verification_rehashes_other_cost_factors(monkeypatch):
+    old_hash = bcrypt_context(4).hash("pw")
+    monkeypatch.setattr(auth, "pwd_context", bcrypt_context(5))
+    valid, new_hash = asyncio.run(auth.verify_and_update_password("pw", old_hash))
+    assert valid and new_hash.startswith("$2b$05$")
+    assert asyncio.run(auth.verify_and_update_password("pw", new_hash)) == (True, None)
+    assert asyncio.run(auth.verify_and_update_password("wrong", old_hash)) == (False, None)
+    assert asyncio.run(auth.verify_and_update_password("pw", None)) == (False, None) # Unknown user
+    assert asyncio.run(auth.verify_and_update_password("pw", "notarealhash")) == (False, None)
+
+def test_password_hashing_is_refused_when_saturated(monkeypatch):
+    monkeypatch.setattr(auth, "pwd_context", bcrypt_context(4))
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 2)
+    async def storm():
+        return await asyncio.gather(*[auth.hash_password("pw") for _ in range(3)], return_exceptions=True)
+    results = asyncio.run(storm())
+    assert [isinstance(result, str) for result in results] == [True, True, False]
+    assert isinstance(results[2], HTTPException) and results[2].status_code == 429
+    assert auth._password_hash_pending == 0
@@ -0,0 +1,61 @@
+import io
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pyarrow as pa
+
+from app.columnar import arrow_schema, iter_columnar_bytes, iter_columnar_rows, record_batch
+
+# (field id, name, type) columns and record_values rows standing in for crud.iter_table_record_values chunks
+EXPORT_FIELDS = [(1, "n", "number"), (2, "b", "boolean"), (3, "d", "date"), (4, "m", "multiSelect"), (5, "l", "linkToRecord"), (6, "t", "text"), (7, "f", "formula"), (8, "a", "attachment")]
+
+def value_row(**columns):
+    return SimpleNamespace(**{"value_number": None, "value_text": None, "value_boolean": None, "value_datetime": None, "value_json": None, **columns})
+
+RECORDS = [
+    (10, {1: value_row(value_number=1.5), 2: value_row(value_boolean=True), 3: value_row(value_datetime=datetime(2024, 1, 2, 10, 30)),
+          4: value_row(value_json=["p", "q"]), 5: value_row(value_json=[3, 4]), 6: value_row(value_text="x"), 7: value_row(value_number=3.0),
+          8: value_row(value_json=[{"filename": "f.png"}])}),
+    (11, {2: value_row(value_boolean=False), 7: value_row(value_text="#ERROR!")}),
+    (12, {}),
+]
+
+def field_map():
+    return {name: SimpleNamespace(id=field_id, type=field_type) for field_id, name, field_type in EXPORT_FIELDS if field_type != 'formula'}
+
+def test_record_batch_types_columns_from_field_types():
+    schema = arrow_schema(EXPORT_FIELDS)
+    batch = record_batch(schema, EXPORT_FIELDS, RECORDS)
+    assert [str(field.type) for field in batch.schema] == ["int64", "double", "bool", "timestamp[us, tz=UTC]", "list<item: string>", "list<item: int64>", "string", "string", "string"]
+    assert batch.schema.field("n").metadata == {b"field_id": b"1", b"field_type": b"number"}
+    assert batch.column("record_id").to_pylist() == [10, 11, 12]
+    assert batch.column("n").to_pylist() == [1.5, None, None]
+    assert batch.column("b").to_pylist() == [True, False, None]
+    assert batch.column("d").to_pylist() == [datetime(2024, 1, 2, 10, 30, tzinfo=timezone.utc), None, None]
+    assert batch.column("l").to_pylist() == [[3, 4], None, None]
+    assert batch.column("f").to_pylist() == ["3.0", "#ERROR!", None]
+    assert batch.column("a").to_pylist() == ['[{"filename": "f.png"}]', None, None]
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export_bytes_read_back_as_import_rows(format):
+    schema = arrow_schema(EXPORT_FIELDS)
+    data = b"".join(iter_columnar_bytes(format, schema, [record_batch(schema, EXPORT_FIELDS, RECORDS[:2]), record_batch(schema, EXPORT_FIELDS, RECORDS[2:])]))
+    errors = []
+    rows = list(iter_columnar_rows(io.BytesIO(data), format, field_map(), errors, batch_size=2))
+    assert errors == []
+    assert [row_number for row_number, _ in rows] == [1, 2, 3]
+    assert rows[0][1] == {1: 1.5, 2: True, 3: datetime(2024, 1, 2, 10, 30, tzinfo=timezone.utc), 4: ["p", "q"], 5: [3, 4], 6: "x", 8: [{"filename": "f.png"}]}
+    assert rows[2][1] == {1: None, 2: None, 3: None, 4: None, 5: None, 6: None, 8: None}
+
+def test_import_rows_report_unreadable_values_and_unknown_columns():
+    table = pa.table({"a": ['[{"filename": "ok"}]', "not json"], "t": [1, 2]}) # Attachment JSON, and a number column for a text field
+    sink = io.BytesIO()
+    with pa.ipc.new_file(sink, table.schema) as writer: writer.write_table(table) # IPC file format is accepted too
+    errors = []
+    rows = list(iter_columnar_rows(io.BytesIO(sink.getvalue()), "arrow", field_map(), errors))
+    assert rows == [(1, {8: [{"filename": "ok"}], 6: "1"})]
+    assert errors[0]["row"] == 2 and errors[0]["field"] == "a"
+    errors = []
+    assert list(iter_columnar_rows(io.BytesIO(sink.getvalue()), "arrow", {"other": SimpleNamespace(id=1, type="text")}, errors)) == []
+    assert errors == [{"row": 1, "error": "No data found for any known fields in this row."}, {"row": 2, "error": "No data found for any known fields in this row."}]
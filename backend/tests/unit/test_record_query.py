@@ -0,0 +1,164 @@
+import base64
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import JSON, Boolean, Column, DateTime, Float, Integer, MetaData, Table, Text, create_engine, insert, select
+
+from app.record_query import decode_cursor, encode_cursor, filter_condition, keyset_condition, sort_order_clauses, typed_value_column_name
+
+# One row per record with every typed column, standing in for the outer-joined record_values row of a field
+metadata = MetaData()
+cells = Table(
+    "cells", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("value_number", Float),
+    Column("value_text", Text),
+    Column("value_boolean", Boolean),
+    Column("value_datetime", DateTime),
+    Column("value_json", JSON),
+)
+ROWS = [
+    {"id": 1, "value_number": 5.0, "value_text": "Apple", "value_boolean": True, "value_datetime": datetime(2024, 1, 2, 10, 0), "value_json": ["x"]},
+    {"id": 2, "value_number": 1.5, "value_text": "banana_1", "value_boolean": False, "value_datetime": datetime(2024, 1, 3), "value_json": []},
+    {"id": 3, "value_number": None, "value_text": "", "value_boolean": None, "value_datetime": None, "value_json": None},
+    {"id": 4, "value_number": -2.0, "value_text": "apple pie", "value_boolean": True, "value_datetime": datetime(2024, 1, 2, 23, 0), "value_json": ["y"]},
+    {"id": 5, "value_number": 5.0, "value_text": None, "value_boolean": None, "value_datetime": datetime(2023, 12, 31), "value_json": ["x", "y"]},
+]
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as connection:
+        connection.execute(insert(cells), ROWS)
+        yield connection
+
+def _matching(connection, field_type, operator, value=None):
+    column = cells.c[typed_value_column_name(field_type)]
+    condition = filter_condition(field_type, column, operator, value)
+    query = select(cells.c.id).order_by(cells.c.id)
+    if condition is not None: query = query.where(condition)
+    return [row.id for row in connection.execute(query)]
+
+def test_typed_value_column_name():
+    assert typed_value_column_name('number') == 'value_number'
+    assert typed_value_column_name('formula') == 'value_number'
+    assert typed_value_column_name('singleSelect') == 'value_text'
+    assert typed_value_column_name('lastModifiedTime') == 'value_datetime'
+    assert typed_value_column_name('boolean') == 'value_boolean'
+    assert typed_value_column_name('linkToRecord') == 'value_json'
+
+def test_number_operators(connection):
+    assert _matching(connection, 'number', 'eq', 5) == [1, 5]
+    assert _matching(connection, 'number', 'eq', "1.5") == [2]
+    assert _matching(connection, 'number', 'neq', 5) == [2, 3, 4] # Empty cells are "not equal"
+    assert _matching(connection, 'number', 'gt', 1.5) == [1, 5]
+    assert _matching(connection, 'number', 'gte', 1.5) == [1, 2, 5]
+    assert _matching(connection, 'number', 'lt', 1.5) == [4]
+    assert _matching(connection, 'number', 'lte', 1.5) == [2, 4]
+    assert _matching(connection, 'number', 'between', [-2, 1.5]) == [2, 4]
+    assert _matching(connection, 'number', 'is_empty') == [3]
+    assert _matching(connection, 'number', 'is_not_empty') == [1, 2, 4, 5]
+
+def test_text_operators_are_case_insensitive(connection):
+    assert _matching(connection, 'text', 'eq', "apple") == [1]
+    assert _matching(connection, 'text', 'neq', "APPLE") == [2, 3, 4, 5]
+    assert _matching(connection, 'text', 'contains', "APPLE") == [1, 4]
+    assert _matching(connection, 'text', 'not_contains', "apple") == [2, 3, 5]
+    assert _matching(connection, 'text', 'is_empty') == [3, 5] # NULL and empty string
+    assert _matching(connection, 'singleSelect', 'is_not_empty') == [1, 2, 4]
+
+def test_text_contains_escapes_like_wildcards(connection):
+    assert _matching(connection, 'text', 'contains', "_") == [2]
+    assert _matching(connection, 'text', 'contains', "%") == []
+
+def test_boolean_operators_treat_empty_as_unchecked(connection):
+    assert _matching(connection, 'boolean', 'eq', True) == [1, 4]
+    assert _matching(connection, 'boolean', 'eq', "false") == [2, 3, 5]
+    assert _matching(connection, 'boolean', 'neq', True) == [2, 3, 5]
+    assert _matching(connection, 'boolean', 'is_empty') == [2, 3, 5]
+    assert _matching(connection, 'boolean', 'is_not_empty') == [1, 4]
+
+def test_date_operators_with_whole_days(connection):
+    assert _matching(connection, 'date', 'eq', "2024-01-02") == [1, 4]
+    assert _matching(connection, 'date', 'neq', "2024-01-02") == [2, 3, 5]
+    assert _matching(connection, 'date', 'gt', "2024-01-02") == [2]
+    assert _matching(connection, 'date', 'gte', "2024-01-02") == [1, 2, 4]
+    assert _matching(connection, 'date', 'lt', "2024-01-02") == [5]
+    assert _matching(connection, 'date', 'lte', "2024-01-02") == [1, 4, 5]
+    assert _matching(connection, 'date', 'between', ["2024-01-01", "2024-01-02"]) == [1, 4]
+    assert _matching(connection, 'createdTime', 'is_empty') == [3]
+
+def test_date_operators_with_timestamps(connection):
+    assert _matching(connection, 'date', 'eq', "2024-01-02T10:00:00") == [1]
+    assert _matching(connection, 'date', 'gt', "2024-01-02T10:00:00") == [2, 4]
+    assert _matching(connection, 'date', 'between', ["2024-01-02T12:00:00", "2024-01-03T00:00:00"]) == [2, 4]
+
+def test_json_field_operators(connection):
+    assert _matching(connection, 'multiSelect', 'is_empty') == [2, 3]
+    assert _matching(connection, 'attachment', 'is_not_empty') == [1, 4, 5]
+
+def test_filters_without_a_value_are_ignored(connection):
+    assert _matching(connection, 'number', 'eq', None) == [1, 2, 3, 4, 5]
+    assert _matching(connection, 'text', 'contains', "  ") == [1, 2, 3, 4, 5]
+    assert _matching(connection, 'date', 'between', ["2024-01-01", None]) == [1, 2, 3, 4, 5]
+
+@pytest.mark.parametrize("field_type,operator,value", [
+    ('number', 'contains', "1"),
+    ('boolean', 'gt', True),
+    ('multiSelect', 'eq', "x"),
+    ('text', 'bogus', "x"),
+    ('number', 'eq', "abc"),
+    ('boolean', 'eq', "maybe"),
+    ('date', 'eq', "yesterday"),
+    ('number', 'between', [1]),
+])
+def test_invalid_filters_raise(field_type, operator, value):
+    with pytest.raises(ValueError):
+        filter_condition(field_type, cells.c[typed_value_column_name(field_type)], operator, value)
+
+def _sorted_ids(connection, sort_keys, cursor_values=None, cursor_id=None):
+    query = select(cells.c.id).order_by(*sort_order_clauses(sort_keys, cells.c.id))
+    if cursor_id is not None: query = query.where(keyset_condition(sort_keys, cells.c.id, cursor_values, cursor_id))
+    return [row.id for row in connection.execute(query)]
+
+def test_sort_order_puts_empty_cells_last_and_breaks_ties_by_id(connection):
+    assert _sorted_ids(connection, [(cells.c.value_number, "asc")]) == [4, 2, 1, 5, 3]
+    assert _sorted_ids(connection, [(cells.c.value_number, "desc")]) == [1, 5, 2, 4, 3]
+    assert _sorted_ids(connection, [(cells.c.value_boolean, "desc"), (cells.c.value_number, "asc")]) == [4, 1, 2, 5, 3]
+
+@pytest.mark.parametrize("sort_keys", [
+    [],
+    [("value_number", "asc")],
+    [("value_number", "desc")],
+    [("value_boolean", "desc"), ("value_number", "asc")],
+    [("value_boolean", "asc"), ("value_text", "desc")],
+    [("value_datetime", "desc")],
+])
+def test_keyset_condition_continues_after_every_position(connection, sort_keys):
+    sort_keys = [(cells.c[column_name], direction) for column_name, direction in sort_keys]
+    full_order = _sorted_ids(connection, sort_keys)
+    rows_by_id = {row["id"]: row for row in ROWS}
+    for position, record_id in enumerate(full_order):
+        cursor_values = [rows_by_id[record_id][expression.name] for expression, _ in sort_keys]
+        assert _sorted_ids(connection, sort_keys, cursor_values, record_id) == full_order[position + 1:]
+
+def test_cursor_round_trip():
+    sort_key_ids = [(7, "desc"), (8, "asc"), (9, "asc")]
+    cursor = encode_cursor(sort_key_ids, (datetime(2024, 1, 2, 10, 0), None, True), 42)
+    assert decode_cursor(cursor, sort_key_ids, ['date', 'number', 'boolean']) == ([datetime(2024, 1, 2, 10, 0), None, True], 42)
+
+def test_cursor_rejected_for_a_different_sort():
+    cursor = encode_cursor([(7, "asc")], (1.5,), 3)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [(7, "desc")], ['number'])
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [(7, "asc")], ['text'])
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", [(7, "asc")], ['number'])
+
+@pytest.mark.parametrize("payload", [{"k": 5, "v": [], "id": 1}, {"k": [5], "v": [1.5], "id": 1}, {"k": [[7, "asc"]], "v": 1.5, "id": 1}, [1, 2]])
+def test_tampered_cursor_payloads_are_rejected(payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [(7, "asc")], ['number'])